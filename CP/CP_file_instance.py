@@ -1,31 +1,44 @@
 import numpy as np
-import networkx as nx
 import json 
+from common.bounds import strongest_bound
+from common.preprocessing import prune_arcs
+from common.heuristic import heuristic_result
+
+CONVERTER_VERSION = '3'     # bump when the .dzn contents change: cached .dzn files are regenerated
+
+def array_literal(values):
+    # the whole array through the C json encoder (faster than joining str of every element)
+    return json.dumps(np.asarray(values).tolist())
+
+def matrix_literal(matrix):
+    # 2d array as [| a, b | c, d |]
+    return '[| ' + ' | '.join(', '.join(map(str, row)) for row in np.asarray(matrix).tolist()) + ' |]'
 
 class CP_file_instance:
-    def __init__(self, filename, m, n, l, s, d):
-        self.filename=filename
-        self.m = m  # n. couriers
-        self.n = n  # n. items
-        self.l = l  # courier load
-        self.s = s  # item size and endpoint
-        self.d = np.array(d)  # manhattan distance matrix
+    def __init__(self, instance, arcs=None):
+        self.filename = instance.name
+        self.m = instance.m  # n. couriers
+        self.n = instance.n  # n. items
+        self.l = instance.capacities.tolist()  # courier load
+        self.s = instance.sizes.tolist()  # item size and endpoint
+        self.d = instance.distances  # manhattan distance matrix
+        self.lower = strongest_bound(instance)
+        # heuristic solution: upper bound for the model, reported if the solver finds nothing
+        self.heuristic = heuristic_result(instance, self.lower)
+        if self.heuristic['obj'] is not None:
+            self.upper = self.heuristic['obj']
+        else:
+            self.upper = int(self.d.max()) * (self.n + 1)   # no route has more than n+1 arcs
+        self.arcs = arcs if arcs is not None else prune_arcs(instance, self.upper)
         self.generate_graph()
-        self.lower = self.generate_lowerbound()
 
     def __repr__(self):
         return f"instance(m={self.m}, n={self.n}, l={self.l}, s={self.s}, d={self.d})"
-    
-    def generate_lowerbound(self):
-        distances = []
-        for i in range(self.n):
-            distances.append(self.d[i][self.n] + self.d[self.n][i])
-        return max(distances)
 
     def generate_graph(self):
         """
         it creates a new representation which consist in a set of vertices and edges of the graph
-        G=(V,E)
+        G=(V,E), as the arrays FROM, TO (from 1) and W
 
         """
         tmp_d = np.vstack([self.d, self.d[-1,:]])
@@ -33,40 +46,46 @@ class CP_file_instance:
 
         start = tmp_d.shape[0]-2 # eg. 9x9, 9-2=7
 
-        G = nx.from_numpy_array(tmp_d, create_using=nx.DiGraph) # created the directed, weighted graph
-        to_be_removed = [(u, v)
-                         for u, v in G.edges 
-                         if     u==start+1    # cant start from the end
-                            or  v==start      # we do not want to go back to the starting poing
-                            or  u==v]        # can't stay in the same place
-        
-        G.remove_edges_from(to_be_removed)
-
-        self.graph = G
-        self.edges = G.edges
+        # arcs left by the preprocessing, for any courier (the end is a copy of the depot)
+        allowed = np.zeros(tmp_d.shape, dtype=bool)   # no row for the end: cant start from the end
+        allowed[:-1, :-1] = self.arcs.arcs
+        allowed[:-1, -1] = self.arcs.arcs[:, -1]
+        allowed[:, start] = False       # we do not want to go back to the starting poing
+        np.fill_diagonal(allowed, False)    # can't stay in the same place
+        allowed[start, start+1] = False     # every courier leaves the depot (zero weight arc, left out by networkx)
 
-        edges_array = np.array(G.edges).T
+        # row major, as the edges of the networkx graph used before
+        u, v = np.nonzero(allowed)
+        self.e_from = u+1 # indexes strat from 1 
+        self.e_to   = v+1
+        self.weights = tmp_d[u, v]
 
-        self.e_from = edges_array[0]+1 # indexes strat from 1 
-        self.e_to   = edges_array[1]+1
+        # successor sets for cp_succ.mzn, over the items and the depot N-1 (the end is the depot again)
+        successors = np.where(v == start+1, start, v) + 1
+        self.succ = np.split(successors, np.cumsum(np.bincount(u, minlength=start+1))[:-1])
 
-        self.weights = [G[u][v]['weight'] for u, v in G.edges ]
-        
     def get_graph(self):
-        return self.edges, self.weights
+        return np.stack([self.e_from-1, self.e_to-1], axis=1), self.weights
 
-    def to_file(self, path):
+    def to_file(self, path, source=None):
         out_path = "".join([path, self.filename, '.dzn'])
 
         with open(out_path, 'w') as f:
+            if source is not None:
+                # cache header, read back by utils.convert_instance
+                f.write('%% source: %s\n' % source)
+                f.write('%% heuristic: %s\n' % json.dumps(self.heuristic))
             f.write('M = %d;\n' % self.m)
             f.write('N = %d;\n' % (self.n+2))
             f.write('L = [' + ', '.join(map(str, self.l)) + '];\n')
             f.write('E = %d;\n' % (len(self.e_from)))# (self.n**2 + self.n))
             f.write('S = [' + ', '.join(f'{size}' for size in self.s) + '];\n')
             f.write('LOWER = %d;\n' % self.lower)
+            f.write('UPPER = %d;\n' % self.upper)
             
-            f.write('FROM = %s;\n' % json.dumps(self.e_from.tolist()))
-            f.write('TO = %s;\n' % json.dumps(self.e_to.tolist()))
-            f.write('W = %s;\n' % json.dumps(self.weights))
+            f.write('FROM = %s;\n' % array_literal(self.e_from))
+            f.write('TO = %s;\n' % array_literal(self.e_to))
+            f.write('W = %s;\n' % array_literal(self.weights))
+            f.write('D = %s;\n' % matrix_literal(self.d))
+            f.write('SUCC = [%s];\n' % ', '.join('{' + ', '.join(map(str, succ.tolist())) + '}' for succ in self.succ))
         return out_path
\ No newline at end of file
@@ -35,6 +35,18 @@ class Solutions:
 
         return out
 
+    def convert_successors(self, succ):
+        # cp_succ.mzn: follow succ[i] from the depot (last node) back to it
+        out = []
+        for row in succ:
+            depot = len(row)
+            route, node = [], row[depot-1]
+            while node != depot:
+                route.append(node)
+                node = row[node-1]
+            out.append(route)
+        return out
+
     def set_exec_time(self, time:int=0):
         self.solution[self.solver_type]["time"] = time
 
@@ -48,7 +60,21 @@ class Solutions:
         self.solution[self.solver_type]["optimal"] = True if data['status'] == Status.OPTIMAL_SOLUTION else False
         self.solution[self.solver_type]["obj"] = data['max_distance']
 
-        self.solution[self.solver_type]["sol"] = self.convert_solution(data['path'])
+        if 'succ' in data:
+            self.solution[self.solver_type]["sol"] = self.convert_successors(data['succ'])
+        else:
+            self.solution[self.solver_type]["sol"] = self.convert_solution(data['path'])
+
+    def set_progress(self, progress):
+        # progress: (time, max_distance) of every improving solution, in order
+        if progress:
+            self.solution[self.solver_type]["time_to_first"] = round(progress[0][0], 2)
+            self.solution[self.solver_type]["time_to_best"] = round(progress[-1][0], 2)
+
+    def set_compile_time(self, compile_time, total_time):
+        # flattening (0 when the cached FlatZinc was used) and search, apart
+        self.solution[self.solver_type]["compile_time"] = round(compile_time, 2)
+        self.solution[self.solver_type]["solve_time"] = round(total_time - compile_time, 2)
 
     def set_failed_solution(self):
         self.failed = True
@@ -1,9 +1,11 @@
 import os
-import numpy as np
+import asyncio
 import datetime
 import minizinc
 from minizinc import Instance, Model, Solver, Status
 from CP.Solutions import *
+from CP.flatzinc import compile_instance, FlatInstance
+from CP.profiles import solver_options, search_parameters, solve_arguments
 import time
 
 debug = False
@@ -15,46 +17,130 @@ if debug:
     module_path = os.path.dirname(os.path.realpath(__file__))
     print(module_path)
 
-def cp_model(instance_file:str,
-             solver:str = 'chuffed', # gecode   chuffed
-             time_limit:int=Solutions.MAX_TIME,
-             verbose = True,
-             symm_break = False
-            )->Solutions:
+SOLUTION_FIELDS = ('max_distance', 'courier_distances', 'node_subset', 'edge_subset', 'current_load', 'path',
+                   'succ', 'courier')
+# model: (without, with symmetry breaking)
+MODELS = {
+    'path': ('cp.mzn', 'cp_sb.mzn'),            # bounded_dpath over the edge list
+    'succ': ('cp_succ.mzn', 'cp_succ_sb.mzn'),  # successor variables and subcircuit
+}
+
+def result_key(solver:str, symm_break:bool, model:str = 'path')->str:
+    # gecode, SB_gecode, and gecode_succ, SB_gecode_succ for the successor model
+    name = solver if symm_break==False else f'SB_{solver}'
+    return name if model == 'path' else f'{name}_{model}'
+
+def key_config(key:str):
+    # (solver, symm_break) of a result_key
+    symm_break = key.startswith('SB_')
+    return (key[3:] if symm_break else key).split('_')[0], symm_break
+
+async def stream_solutions(instance, start_time, on_improve, **solve_kwargs):
+    # every intermediate solution as soon as the solver prints it, the last result only carries the final status
+    best, status = None, Status.UNKNOWN
+    async for result in instance.solutions(intermediate_solutions=True, **solve_kwargs):
+        status = result.status
+        if result.solution is None:
+            continue
+        if best is None or result['max_distance'] < best['max_distance']:
+            # the fields the model has (path for cp.mzn, succ for cp_succ.mzn)
+            best = {field: result[field] for field in SOLUTION_FIELDS if hasattr(result.solution, field)}
+            best['time'] = time.time() - start_time
+            on_improve(best)
+    return best, status
+
+async def cp_model_async(instance_file:str,
+                         solver:str = 'chuffed', # gecode   chuffed
+                         time_limit:int=Solutions.MAX_TIME,
+                         verbose = True,
+                         symm_break = False,
+                         processes:int = None,
+                         on_solution = None,
+                         fzn_cache = True,
+                         model:str = 'path',
+                         options:dict = None,
+                         upper:int = None
+                        )->Solutions:
+    # on_solution: called with get_solution() of every improving solution (not optimal yet)
+    # fzn_cache: solve the FlatZinc compiled by a previous run of the same model, data and solver
+    # options: profiles.solver_options() of the run (seed, free search, restarts, ...), the defaults if None
+    # upper: max_distance bound tighter than UPPER of the .dzn (the objective of another portfolio pipeline)
 
     module_path = os.path.dirname(os.path.realpath(__file__))
     filename = instance_file.split('/')[-1]
-    name = solver if symm_break==False else f'SB_{solver}'
+    name = result_key(solver, symm_break, model)
     current_solution = Solutions(filename=filename, solver_type=name)
-    if symm_break:
-        cp_model = Model(module_path+'/cp_sb.mzn')
-    else:
-        cp_model = Model(module_path+'/cp.mzn')
+    model_file = module_path+'/'+MODELS[model][int(bool(symm_break))]
+    cp_model = Model(model_file)
     cp_model.add_file(instance_file, parse_data=True)
+    options = options or solver_options(solver)
+    parameters = search_parameters(options)
+    for key, value in parameters.items():
+        cp_model[key] = value
+    compiled = parameters
+    if upper is not None:
+        cp_model.add_string(f"constraint max_distance <= {int(upper)};\n")
+        compiled = dict(parameters, upper=int(upper))
 
     solver_ins = Solver.lookup(solver)
     instance = Instance(solver_ins, cp_model)
     timedelta = datetime.timedelta(seconds=time_limit)
+    solve_kwargs = solve_arguments(solver, options, processes)
+    progress = []   # (time, max_distance) of every improving solution
+
+    latest = []     # last improving solution
+
+    def improve(data):
+        progress.append((data['time'], data['max_distance']))
+        latest[:] = [data]
+        if on_solution is not None:
+            # what is left if the run is killed now: the solution so far, not optimal
+            partial = Solutions(filename=filename, solver_type=name)
+            partial.set_solution(dict(data, time=Solutions.MAX_TIME, status=Status.SATISFIED))
+            partial.set_progress(progress)
+            on_solution(partial.get_solution())
+
+    compile_time = 0
+
     try:
         #   ⚠⚠⚠ DANGER ZONE ⚠⚠⚠
         start_time = time.time()
-        result = instance.solve(timeout=timedelta,
-                                intermediate_solutions=False,
-                                verbose=False)
+        if fzn_cache:
+            try:
+                # MiniZinc's time limit covers flattening too: the search gets what is left
+                fzn, ozn, compile_time = await compile_instance(instance, model_file, instance_file,
+                                                                solver_ins, timedelta, compiled)
+                instance = FlatInstance(solver_ins, cp_model, fzn, ozn)
+                timedelta = datetime.timedelta(seconds=max(time_limit - compile_time, 1))
+            except minizinc.MiniZincError as e:
+                # the direct solve gets what the failed compilation left
+                compile_time = time.time() - start_time
+                timedelta = datetime.timedelta(seconds=time_limit - compile_time)
+                if verbose:
+                    print("FlatZinc compilation failed, solving the model directly:", e)
+        if timedelta.total_seconds() > 0:
+            best, status = await stream_solutions(instance, start_time, improve,
+                                                  timeout=timedelta,
+                                                  verbose=False,
+                                                  **solve_kwargs)
+        else:
+            best, status = None, Status.UNKNOWN
         total_time = time.time() - start_time
-        if result.solution:
-            data = {'time'              :total_time,
-                    'max_distance'      :result['max_distance'],
-                    'courier_distances' :result['courier_distances'],
-                    'node_subset'       :result['node_subset'],
-                    'edge_subset'       :result['edge_subset'],
-                    'current_load'      :result['current_load'],
-                    'path'              :result['path'],
-                    'status'            :result.status  # OPTIMAL_SOLUTION, SATISFIED, UNSATISFIABLE, UNKNOWN, ALL_SOLUTIONS
-                    }
-            
+        if best is not None:
+            # OPTIMAL_SOLUTION, SATISFIED, UNSATISFIABLE, UNKNOWN, ALL_SOLUTIONS
+            data = dict(best, time=total_time, status=status)
             current_solution.set_exec_time(total_time)
             current_solution.set_solution(data)
+            current_solution.set_progress(progress)
+            current_solution.set_compile_time(compile_time, total_time)
+        else:
+            current_solution.set_failed_solution()
+
+    except asyncio.CancelledError:
+        # stopped from outside (race_configurations): the solution so far, not optimal
+        if latest:
+            current_solution.set_solution(dict(latest[0], time=Solutions.MAX_TIME, status=Status.SATISFIED))
+            current_solution.set_progress(progress)
         else:
             current_solution.set_failed_solution()
 
@@ -64,4 +150,61 @@ def cp_model(instance_file:str,
             print(e)
         current_solution.set_failed_solution()
         
-    return current_solution
\ No newline at end of file
+    return current_solution
+
+def cp_model(instance_file:str, **kwargs)->Solutions:
+    # one configuration, blocking: same arguments as cp_model_async
+    return asyncio.run(cp_model_async(instance_file, **kwargs))
+
+async def race_configurations(instance_file:str, configurations, cores:int = 1, on_solution = None,
+                              time_limit:int = Solutions.MAX_TIME, model:str = 'path', profile = None,
+                              overrides:dict = None)->dict:
+    '''
+    configurations: (solver, symm_break) pairs solved concurrently on instance_file, at most
+    `cores` processes at a time (a configuration with gecode processes takes that many, at
+    most `cores`). The first one proving optimality cancels the others, which keep the best
+    solution they found (not optimal); the ones never started are reported as failed.
+    profile and overrides: the options of every solver (profiles.solver_options).
+    Returns the get_solution() entries of all the configurations.
+    '''
+    filename = instance_file.split('/')[-1]
+    cores = max(cores, 1)
+    free = [cores]
+    condition = asyncio.Condition()
+
+    async def run(solver, symm_break):
+        options = solver_options(solver, profile, **(overrides or {}))
+        slots = min(options['processes'] or 1, cores)
+        async with condition:
+            await condition.wait_for(lambda: free[0] >= slots)
+            free[0] -= slots
+        try:
+            return await cp_model_async(instance_file, solver=solver, time_limit=time_limit, verbose=False,
+                                        symm_break=symm_break, processes=slots, on_solution=on_solution,
+                                        model=model, options=options)
+        finally:
+            async with condition:
+                free[0] += slots
+                condition.notify_all()
+
+    tasks = [asyncio.ensure_future(run(solver, symm_break)) for solver, symm_break in configurations]
+    results = {}
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.cancelled():
+                continue
+            solution = task.result().get_solution()
+            results.update(solution)
+            if any(result['optimal'] for result in solution.values()):
+                for other in pending:
+                    other.cancel()
+
+    for solver, symm_break in configurations:
+        name = result_key(solver, symm_break, model)
+        if name not in results:
+            skipped = Solutions(filename=filename, solver_type=name)
+            skipped.set_failed_solution()
+            results.update(skipped.get_solution())
+    return results
\ No newline at end of file
@@ -1,9 +1,116 @@
 from CP.utils import *
 from CP.CP_file_instance import *
 from CP.cp import *
+from CP.profiles import load_profiles, solver_options
+from common.results_db import record_result, export_pending
+from common.heuristic import fallback
+from common.incumbent import read_incumbent, publish_incumbent
+from common.workers import available_cores
 from tqdm import tqdm
+import asyncio
 
-def execute_cp(instance_name: str, solver_name: str = 'gecode', symbreak: bool = True):
+def checkpoint(instance: str):
+    # every improving solution is recorded in the results store right away: a crash or a kill at the time
+    # limit still leaves it. Later calls replace the run of the key; res/CP/ is only rewritten by the final
+    # call (export=True), or by the next run after a crash
+    run_ids = {}
+    def on_solution(partial, export=False):
+        for key, result in partial.items():
+            solver, symm_break = key_config(key)
+            run_ids[key] = record_result('CP', instance, key, result, solver, symm_break, run_id=run_ids.get(key),
+                                         export=False)
+        if export:
+            export_pending()
+    return on_solution
+
+def solve_instance(instance_name: str, solver_name: str = 'gecode', symbreak: bool = True, threads: int = None,
+                   on_solution=None, model: str = 'path', profile=None, incumbent=None,
+                   time_limit: int = Solutions.MAX_TIME, **options):
+    # single instance, in the current process: only the requested .dzn is generated
+    # incumbent: objective shared by the portfolio pipelines, the bound on start, every improving solution is published
+    module_path = os.path.dirname(os.path.realpath(__file__))
+    savepath = module_path+'/instances/'
+    instances_path = "/".join(module_path.split('/')[:-1]+['instances'])
+    name = choose_instance(int(instance_name))
+    path, heuristic = convert_instance(instances_path+'/'+'.'.join(name.split('.')[:-1]+['dat']), savepath)
+    if heuristic['optimal']:
+        # the heuristic tours reach the lower bound: nothing left to prove
+        return heuristic
+
+    def improve(partial):
+        for result in partial.values():
+            publish_incumbent(incumbent, result['obj'], result['sol'])
+        if on_solution is not None:
+            on_solution(partial)
+
+    upper = read_incumbent(incumbent)
+    if upper is not None and heuristic['obj'] is not None and upper >= heuristic['obj']:
+        # UPPER of the .dzn is as tight: the cached FlatZinc is used
+        upper = None
+    result = cp_model(path,
+                      verbose=False,
+                      symm_break=symbreak,
+                      solver=solver_name,
+                      processes=threads,
+                      time_limit=time_limit,
+                      on_solution=improve,
+                      model=model,
+                      options=solver_options(solver_name, profile, **options),
+                      upper=upper
+                      ).get_solution()
+    return fallback(next(iter(result.values())), heuristic)
+
+def store_result(result, instance_name: str, solver_name: str, symbreak: bool, model: str = 'path'):
+    name = choose_instance(int(instance_name))
+    key = result_key(solver_name, symbreak, model)
+    record_result('CP', '.'.join(name.split('.')[:-1]), key, result, solver_name, symbreak)
+
+def sweep_profiles(instance_files, solver_name: str, symbreak: bool, model: str = 'path', profiles=None,
+                   time_limit: int = Solutions.MAX_TIME, **options):
+    '''
+    Every profile (all those in CP/profiles.json by default) on every instance, one run at a
+    time. Profiles are ranked by the instances solved to optimality, then by the total time
+    to optimal (search only, time_limit for the others). The ranking is printed and saved
+    to CP/sweeps/ with the times of every run.
+    '''
+    module_path = os.path.dirname(os.path.realpath(__file__))
+    profiles = profiles or list(load_profiles())
+    times = {profile: {} for profile in profiles}
+    for dat_path in tqdm(instance_files, desc="sweeping profiles"):
+        path, _ = convert_instance(dat_path, module_path+'/instances/')
+        name = os.path.basename(path).split('.')[0]
+        for profile in profiles:
+            result = next(iter(cp_model(path,
+                                        verbose=False,
+                                        symm_break=symbreak,
+                                        solver=solver_name,
+                                        time_limit=time_limit,
+                                        model=model,
+                                        options=solver_options(solver_name, profile, **options)
+                                        ).get_solution().values()))
+            times[profile][name] = result.get('solve_time', result['time']) if result['optimal'] else None
+
+    summary = {profile: {'optimal': sum(t is not None for t in runs.values()),
+                         'time': round(sum(time_limit if t is None else t for t in runs.values()), 2)}
+               for profile, runs in times.items()}
+    ranking = sorted(profiles, key=lambda profile: (-summary[profile]['optimal'], summary[profile]['time']))
+    print(f"{'profile':<16}{'optimal':>8}{'time to optimal':>18}")
+    for profile in ranking:
+        print(f"{profile:<16}{summary[profile]['optimal']:>8}{summary[profile]['time']:>18.2f}")
+
+    os.makedirs(module_path+'/sweeps', exist_ok=True)
+    save_result({'ranking': ranking, 'summary': summary, 'times': times},
+                module_path+'/sweeps/'+result_key(solver_name, symbreak, model)+'.json')
+    return ranking
+
+def execute_cp(instance_name: str, solver_name: str = 'gecode', symbreak: bool = True, cores: int = None,
+               model: str = 'path', profile=None, sweep: bool = False, profiles: str = None,
+               time_limit: int = Solutions.MAX_TIME, **options):
+    # cores: configurations solved at the same time with all (every available core by default)
+    # model: path (cp.mzn, bounded_dpath) or succ (cp_succ.mzn, subcircuit)
+    # profile: options profile in CP/profiles.json, options (seed=, restart_scale=, ...) override it
+    # sweep: run the profiles (comma separated, all by default) on the instances and rank them
+    cores = cores or len(available_cores())
     solvers = ['gecode', 'chuffed']
     symm_break = [True, False]
 
@@ -15,53 +122,66 @@ def execute_cp(instance_name: str, solver_name: str = 'gecode', symbreak: bool =
         raise Exception(f"{solver_name} does not exist")
     if not type(symbreak) == bool:
         raise Exception(f"sb parameter must be boolean")
+    if model not in MODELS:
+        raise Exception(f"{model} model does not exist")
     
-    # Converting all instances
-    for name in tqdm(instances_names, desc="Converting instances into .dzn files"):
-        # creating the .dzn file
-        path = instances_path+'/'+name
-        istc = read_raw_instances(path)
-        istc.to_file(savepath)
-
-    outpath = "/".join(module_path.split('/')[:-1]+['res', 'CP'])
-    os.makedirs(outpath, exist_ok=True)
-    dzn_names = os.listdir(savepath)    # list of dzn contained into CP/instances
+    solver_options(solver_name, profile, **options)     # unknown profile or options: fail before solving
 
-    solutions = {name:{} for name in dzn_names}
+    if sweep:
+        dat_names = sorted(instances_names) if str(instance_name) == 'all' else \
+            ['.'.join(choose_instance(int(instance_name)).split('.')[:-1]+['dat'])]
+        sweep_profiles([instances_path+'/'+name for name in dat_names], solver_name, symbreak, model,
+                       profiles.split(',') if profiles else None, time_limit, **options)
+        return
 
     try:
         inst = int(instance_name)
 
         instance_name = choose_instance(inst)
+        dat_name = '.'.join(instance_name.split('.')[:-1]+['dat'])
 
-        if instance_name in dzn_names:
-            # execute cp and return result
-            path = savepath+instance_name
-
-            result_tmp = cp_model(path,
-                                verbose=False, 
-                                symm_break=symbreak, 
-                                solver=solver_name
-                                ).get_solution()
-            solutions[instance_name].update(result_tmp)
-            save_result(solutions[instance_name], outpath+'/'+'.'.join(instance_name.split('.')[:-1]+['json']))
+        if dat_name in instances_names:
+            # only the requested instance is converted, and only if its .dzn is stale
+            path, heuristic = convert_instance(instances_path+'/'+dat_name, savepath)
+            store = checkpoint('.'.join(instance_name.split('.')[:-1]))
+            if heuristic['optimal']:
+                # the heuristic tours reach the lower bound: nothing left to prove
+                store({result_key(solver_name, symbreak, model): heuristic}, export=True)
+            else:
+                result_tmp = cp_model(path,
+                                    verbose=False, 
+                                    symm_break=symbreak, 
+                                    solver=solver_name,
+                                    time_limit=time_limit,
+                                    on_solution=store,
+                                    model=model,
+                                    options=solver_options(solver_name, profile, **options)
+                                    ).get_solution()
+                store({key: fallback(result, heuristic) for key, result in result_tmp.items()}, export=True)
         
     except ValueError as e:
         # instance_name is a string all
-        pbar = tqdm(sorted(dzn_names))
-        for name in pbar:
+        pbar = tqdm(sorted(instances_names))
+        for dat_name in pbar:
+            path, heuristic = convert_instance(instances_path+'/'+dat_name, savepath)
+            name = os.path.basename(path)
             pbar.set_description(f"solving problem {name}")
-            for solver in solvers:
-                for sb in symm_break:
-                    path = savepath+'/'+name
-                    
-                    result_tmp = cp_model(path,
-                                            verbose=False, 
-                                            symm_break=sb, 
-                                            solver=solver
-                                            ).get_solution()
-                    solutions[name].update(result_tmp)
-            save_result(solutions[name], outpath+'/'+'.'.join(name.split('.')[:-1]+['json']))
+            # every (solver, symm_break) configuration at once, within the core budget
+            store = checkpoint('.'.join(name.split('.')[:-1]))
+            if heuristic['optimal']:
+                store({result_key(solver, sb, model): heuristic for solver in solvers for sb in symm_break},
+                      export=True)
+                continue
+            result_tmp = asyncio.run(race_configurations(path,
+                                                         [(solver, sb) for solver in solvers for sb in symm_break],
+                                                         cores=cores,
+                                                         on_solution=store,
+                                                         time_limit=time_limit,
+                                                         model=model,
+                                                         profile=profile,
+                                                         overrides=options
+                                                         ))
+            store({key: fallback(result, heuristic) for key, result in result_tmp.items()}, export=True)
         # save_solutions(solutions, outpath)
     print("execution ended correctly")
     
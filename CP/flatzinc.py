@@ -0,0 +1,109 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import tempfile
+import contextlib
+from pathlib import Path
+import minizinc
+from minizinc import Instance
+from minizinc.error import parse_error
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'fzn')
+# the output model is compiled for the json stream Instance.solutions() reads
+COMPILE_FLAGS = {'output-mode': 'json', 'output-objective': True, 'output-output-item': True}
+
+def model_files(model_file:str):
+    # the model and the local files it includes (cp_succ_sb.mzn includes cp_succ.mzn)
+    files = [model_file]
+    with open(model_file) as file:
+        for include in re.findall(r'^\s*include\s+"([^"]+)"', file.read(), re.MULTILINE):
+            path = os.path.join(os.path.dirname(model_file), include)
+            if os.path.exists(path):
+                files.extend(model_files(path))
+    return files
+
+def compile_key(model_file:str, data_file:str, solver, parameters:dict = None) -> str:
+    # what the FlatZinc depends on: model, data and parameters, solver (its globals library) and compiler version
+    digest = hashlib.sha256()
+    for path in model_files(model_file) + [data_file]:
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    digest.update(json.dumps(parameters or {}, sort_keys=True).encode())
+    digest.update(f"{solver.id} {solver.version} {minizinc.default_driver.parsed_version}".encode())
+    return digest.hexdigest()
+
+async def compile_instance(instance, model_file:str, data_file:str, solver, timeout=None, parameters:dict = None):
+    '''
+    (fzn, ozn, compile seconds) of the instance for the solver: compiled once, then read
+    from CACHE_DIR whatever the time limit, seed or solver flags of the run. parameters:
+    the model parameters set on the instance besides the data file (search annotations)
+    and the constraints added to it. The compiler runs as a subprocess of the event loop
+    (the command of Instance.flat), killed if the task is cancelled.
+    '''
+    key = compile_key(model_file, data_file, solver, parameters)
+    fzn = os.path.join(CACHE_DIR, key + '.fzn')
+    ozn = os.path.join(CACHE_DIR, key + '.ozn')
+    if os.path.exists(fzn) and os.path.exists(ozn):
+        return fzn, ozn, 0.0
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    start = time.time()
+    temporary = []
+    for suffix in ('.fzn', '.ozn'):
+        handle, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=suffix)
+        os.close(handle)
+        temporary.append(tmp)
+    flat_fzn, flat_ozn = temporary
+    args = ['--compile', '--fzn', flat_fzn, '--ozn', flat_ozn]
+    if timeout is not None:
+        args += ['--time-limit', str(int(timeout.total_seconds() * 1000))]
+    for flag, value in COMPILE_FLAGS.items():
+        args += ['--' + flag] if value is True else ['--' + flag, str(value)]
+    try:
+        with instance.files() as files, solver.configuration() as conf:
+            process = await asyncio.create_subprocess_exec(
+                str(minizinc.default_driver._executable), '--solver', conf, '--allow-multiple-assignments',
+                *args, *map(str, files), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            try:
+                _, stderr = await process.communicate()
+            except asyncio.CancelledError:
+                process.kill()
+                await process.wait()
+                raise
+        if process.returncode != 0:
+            raise parse_error(stderr)
+        if os.path.getsize(flat_fzn) == 0:
+            raise minizinc.MiniZincError(message="flattening produced no FlatZinc (time limit?)")
+        # renamed, the .fzn last: a concurrent run never reads a partial pair
+        os.replace(flat_ozn, ozn)
+        os.replace(flat_fzn, fzn)
+    finally:
+        for tmp in temporary:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return fzn, ozn, time.time() - start
+
+class FlatInstance(Instance):
+    '''
+    Instance solved from a compiled .fzn: model and data are only analysed (method and
+    output fields), MiniZinc gets the .fzn and turns the solver output back with the .ozn.
+    '''
+    def __init__(self, solver, model, fzn:str, ozn:str):
+        super().__init__(solver, model)
+        self._flat = None
+        self.analyse()
+        self._flat = (Path(fzn), ozn)
+
+    @contextlib.contextmanager
+    def files(self):
+        if self._flat is None:
+            with super().files() as files:
+                yield files
+        else:
+            yield [self._flat[0]]
+
+    def solutions(self, **kwargs):
+        return super().solutions(**{'ozn-file': self._flat[1]}, **kwargs)
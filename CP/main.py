@@ -4,7 +4,6 @@ from CP.cp import *
 from tqdm import tqdm
      
 def run_cp():
-    convert_files=True
     solvers = ['gecode', 'chuffed']
     symm_break = [True, False]
 
@@ -13,15 +12,11 @@ def run_cp():
     instances_path = "/".join(module_path.split('/')[:-1]+['instances'])
     instances_names = os.listdir(instances_path)
 
-    if convert_files:
-        for name in tqdm(instances_names, desc="Converting instances into .dzn files"):
-            # creating the .dzn file
-            path = instances_path+'/'+name
-            istc = read_raw_instances(path)
-            cp_path = istc.to_file(savepath)
+    # .dzn files regenerated only where the .dat or the converter changed
+    dzn_names = [os.path.basename(convert_instance(instances_path+'/'+name, savepath)[0])
+                 for name in tqdm(instances_names, desc="Converting instances into .dzn files")]
 
     outpath = "/".join(module_path.split('/')[:-1]+['res', 'CP'])
-    dzn_names = os.listdir(savepath)    # list of dzn contained into CP/instances
     solutions = {name:{} for name in dzn_names}
 
     pbar = tqdm(dzn_names)
@@ -0,0 +1,66 @@
+import os
+import json
+
+PROFILES_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'profiles.json')
+DEFAULT_OPTIONS = {
+    'processes': None,          # gecode -p, chuffed is sequential
+    'free_search': False,       # chuffed -f: alternates the search annotations with activity based search
+    'seed': None,
+    'varsel': 'dom_w_deg',      # variable selection of the assignment search
+    'restart': 'luby',
+    'restart_scale': 1000,
+}
+# search options given to the model as parameters
+VARSEL = {'dom_w_deg': 1, 'first_fail': 2, 'input_order': 3}
+RESTART = {'none': 0, 'luby': 1, 'geometric': 2}
+# solvers that run on more than one process, processes is ignored for the others
+PARALLEL_SOLVERS = {'gecode'}
+
+def load_profiles(path:str = PROFILES_FILE) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+def solver_options(solver:str, profile = None, path:str = PROFILES_FILE, **overrides) -> dict:
+    '''
+    Options of a CP run with solver: DEFAULT_OPTIONS, updated by the profile (a name in the
+    profiles file or a dict; its entries named after a solver apply to that solver only)
+    and then by the overrides.
+    '''
+    if isinstance(profile, str):
+        profiles = load_profiles(path)
+        if profile not in profiles:
+            raise Exception(f"{profile} profile does not exist in {path}")
+        profile = profiles[profile]
+    profile = profile or {}
+    options = dict(DEFAULT_OPTIONS)
+    options.update({key: value for key, value in profile.items() if key in DEFAULT_OPTIONS})
+    options.update(profile.get(solver, {}))
+    options.update(overrides)
+    unknown = set(options) - set(DEFAULT_OPTIONS)
+    if unknown:
+        raise Exception(f"unknown CP options {sorted(unknown)}")
+    if solver not in PARALLEL_SOLVERS:
+        options['processes'] = None
+    if options['varsel'] not in VARSEL or options['restart'] not in RESTART:
+        raise Exception(f"varsel must be one of {list(VARSEL)}, restart one of {list(RESTART)}")
+    return options
+
+def search_parameters(options:dict) -> dict:
+    # model parameters of the search annotations
+    return {
+        'VARSEL': VARSEL[options['varsel']],
+        'RESTART': RESTART[options['restart']],
+        'RESTART_SCALE': int(options['restart_scale']),
+    }
+
+def solve_arguments(solver:str, options:dict, processes:int = None) -> dict:
+    # keyword arguments of Instance.solutions(); processes (the core budget) wins over the profile
+    arguments = {}
+    processes = processes or options['processes']
+    if solver in PARALLEL_SOLVERS and processes is not None and processes > 1:
+        arguments['processes'] = processes
+    if options['seed'] is not None:
+        arguments['random_seed'] = options['seed']
+    if options['free_search']:
+        arguments['free_search'] = True
+    return arguments
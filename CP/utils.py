@@ -1,25 +1,46 @@
 from CP.CP_file_instance import *
+from common.instance import Instance
 import numpy as np
+import hashlib
 import json
+import os
 
 def read_raw_instances(path:str) -> CP_file_instance:
-    filename = "".join(path.split('/')[-1].split('.')[:-1])
-    with open(path, 'r') as f:
-        matrix = ''
-        for i, line in enumerate(f):
-            if i == 0:
-                m = int(line)
-            elif i == 1:
-                n = int(line)
-            elif i == 2:
-                l = [int(x) for x in line.split() if x.strip()]   # load
-            elif i == 3:
-                s = [int(x) for x in line.split() if x.strip()]   # item size
-            else:
-                matrix += line[:-1] + '; '
-    d = np.matrix(matrix[:-2]).tolist()
-    instance = CP_file_instance(filename,m,n,l,s,d)
-    return instance
+    return CP_file_instance(Instance.from_file(path))
+
+def source_hash(path:str) -> str:
+    # the .dat contents and the converter version a .dzn was generated from
+    with open(path, 'rb') as file:
+        digest = hashlib.sha256(file.read())
+    digest.update(CONVERTER_VERSION.encode())
+    return digest.hexdigest()
+
+def read_header(dzn_path:str):
+    # (source hash, heuristic result) of a cached .dzn, (None, None) if missing or unreadable
+    try:
+        with open(dzn_path) as file:
+            source, heuristic = file.readline(), file.readline()
+        if source.startswith('% source: ') and heuristic.startswith('% heuristic: '):
+            return source[len('% source: '):].strip(), json.loads(heuristic[len('% heuristic: '):])
+    except (OSError, ValueError):
+        pass
+    return None, None
+
+def convert_instance(dat_path:str, savepath:str):
+    '''
+    .dzn of a .dat instance in savepath, converted only when it is missing or was generated
+    from another .dat or converter version. Returns its path and the heuristic result
+    stored in its header (the fallback when the solver finds nothing).
+    '''
+    name = '.'.join(os.path.basename(dat_path).split('.')[:-1])
+    dzn_path = os.path.join(savepath, name + '.dzn')
+    digest = source_hash(dat_path)
+    source, heuristic = read_header(dzn_path)
+    if source == digest:
+        return dzn_path, heuristic
+    istc = read_raw_instances(dat_path)
+    istc.to_file(savepath, source=digest)
+    return dzn_path, istc.heuristic
 
 def save_solutions(output_dict, path):
     """
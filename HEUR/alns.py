@@ -0,0 +1,249 @@
+import math
+import time
+import numpy as np
+from common.heuristic import two_opt, rebalance, route_length
+
+class Solution:
+    '''
+    routes[i]: items of courier i in visiting order (from 0), lengths and loads kept
+    up to date with the O(1) insertion/removal deltas.
+    '''
+    __slots__ = ('routes', 'lengths', 'loads')
+
+    def __init__(self, routes, lengths, loads):
+        self.routes = routes
+        self.lengths = lengths
+        self.loads = loads
+
+    def copy(self):
+        return Solution([list(route) for route in self.routes], list(self.lengths), list(self.loads))
+
+    @property
+    def obj(self):
+        return max(self.lengths)
+
+class ALNS:
+    '''
+    Adaptive large neighbourhood search for the min-max objective: at every iteration a
+    destroy operator removes some items and a repair operator inserts them back, both
+    picked by roulette wheel on weights adapted to how well they did; the new solution
+    is accepted by simulated annealing.
+    '''
+    SEGMENT = 100                   # iterations between weight updates
+    REACTION = 0.1
+    SCORES = (33, 9, 13)            # new best, better than current, accepted
+
+    def __init__(self, instance, seed=0):
+        self.instance = instance
+        self.m, self.n, self.o = instance.m, instance.n, instance.origin
+        self.d = instance.distances.astype(np.int64)
+        self.sizes = instance.sizes.astype(np.int64)
+        self.capacities = instance.capacities.astype(np.int64)
+        self.rng = np.random.default_rng(seed)
+        # symmetric closeness for the related removal
+        self.closeness = self.d[:self.n, :self.n] + self.d[:self.n, :self.n].T
+        # lexicographic insertion keys: (resulting max, delta), delta in [-dmax, 2 dmax]
+        self.dmax = int(self.d.max())
+        self.scale = 3 * self.dmax + 1
+        # sum of the lengths only breaks ties between equal max
+        self.total_bound = self.m * self.dmax * (self.n + 1) + 1
+        self.destroy_ops = [self.random_removal, self.longest_route_removal, self.related_removal, self.worst_removal]
+        self.repair_ops = [self.greedy_insertion, self.regret_insertion]
+
+    def solution(self, routes):
+        routes = [list(route) for route in routes]
+        lengths = [route_length(route, self.d, self.o) for route in routes]
+        loads = [int(self.sizes[route].sum()) for route in routes]
+        return Solution(routes, lengths, loads)
+
+    def score(self, sol):
+        return sol.obj + sum(sol.lengths) / self.total_bound
+
+    # incremental deltas
+
+    def remove(self, sol, i, p):
+        route, d, o = sol.routes[i], self.d, self.o
+        j = route[p]
+        prev = route[p - 1] if p > 0 else o
+        nxt = route[p + 1] if p + 1 < len(route) else o
+        sol.lengths[i] -= int(d[prev, j] + d[j, nxt] - d[prev, nxt])
+        sol.loads[i] -= int(self.sizes[j])
+        del route[p]
+        return j
+
+    def insert(self, sol, i, p, j):
+        route, d, o = sol.routes[i], self.d, self.o
+        prev = route[p - 1] if p > 0 else o
+        nxt = route[p] if p < len(route) else o
+        sol.lengths[i] += int(d[prev, j] + d[j, nxt] - d[prev, nxt])
+        sol.loads[i] += int(self.sizes[j])
+        route.insert(p, j)
+
+    def remove_items(self, sol, items):
+        items = set(int(j) for j in items)
+        for i, route in enumerate(sol.routes):
+            for p in range(len(route) - 1, -1, -1):
+                if route[p] in items:
+                    self.remove(sol, i, p)
+        return list(items)
+
+    # destroy operators
+
+    def random_removal(self, sol, q):
+        return self.remove_items(sol, self.rng.choice(self.n, size=q, replace=False))
+
+    def longest_route_removal(self, sol, q):
+        # the routes setting the objective lose items first
+        items = []
+        for i in np.argsort(sol.lengths)[::-1]:
+            route = sol.routes[i]
+            k = min(q - len(items), len(route))
+            items.extend(self.rng.choice(route, size=k, replace=False).tolist() if k else [])
+            if len(items) >= q:
+                break
+        return self.remove_items(sol, items)
+
+    def related_removal(self, sol, q):
+        # a random item and the ones closest to it
+        seed = self.rng.integers(self.n)
+        return self.remove_items(sol, np.argsort(self.closeness[seed], kind='stable')[:q])
+
+    def worst_removal(self, sol, q):
+        # largest removal savings, randomized toward the top
+        o, d = self.o, self.d
+        items, savings = [], []
+        for route in sol.routes:
+            if not route:
+                continue
+            r = np.array([o] + route + [o])
+            items.extend(route)
+            savings.extend((d[r[:-2], r[1:-1]] + d[r[1:-1], r[2:]] - d[r[:-2], r[2:]]).tolist())
+        order = np.array(items)[np.argsort(savings, kind='stable')[::-1]]
+        picks = (self.rng.random(q) ** 3 * len(order)).astype(int)
+        return self.remove_items(sol, order[np.unique(picks)])
+
+    # repair operators
+
+    def insertion_column(self, route, items):
+        # best insertion delta and position of every item in one route
+        r = np.array([self.o] + route + [self.o])
+        deltas = self.d[r[:-1], items[:, None]] + self.d[items[:, None], r[1:]] - self.d[r[:-1], r[1:]]
+        pos = np.argmin(deltas, axis=1)
+        return deltas[np.arange(len(items)), pos], pos
+
+    def insertion_keys(self, sol, items, deltas):
+        lengths = np.array(sol.lengths)
+        fits = np.array(sol.loads)[None, :] + self.sizes[items][:, None] <= self.capacities[None, :]
+        keys = np.maximum(lengths[None, :] + deltas, max(sol.lengths)) * self.scale + deltas + self.dmax
+        return np.where(fits, keys, np.iinfo(np.int64).max)
+
+    def repair(self, sol, items, regret):
+        items = np.array(items, dtype=np.int64)
+        if len(items) == 0:
+            return set()
+        deltas = np.empty((len(items), self.m), dtype=np.int64)
+        positions = np.empty((len(items), self.m), dtype=np.int64)
+        for i in range(self.m):
+            deltas[:, i], positions[:, i] = self.insertion_column(sol.routes[i], items)
+        left = np.ones(len(items), dtype=bool)
+        touched = set()
+        while left.any():
+            keys = self.insertion_keys(sol, items, deltas)
+            keys[~left] = np.iinfo(np.int64).max
+            best = keys.min(axis=1)
+            if best[left].max() == np.iinfo(np.int64).max:
+                return None         # some item fits no courier
+            if regret and self.m > 1:
+                second = np.partition(keys, 1, axis=1)[:, 1]
+                # items with a single option are placed first
+                rank = np.where(second == np.iinfo(np.int64).max, np.iinfo(np.int64).max, second - best)
+                rank = np.where(left, rank, -1)
+                k = int(np.argmax(rank))
+            else:
+                k = int(np.argmin(best))
+            i = int(np.argmin(keys[k]))
+            self.insert(sol, i, int(positions[k, i]), int(items[k]))
+            left[k] = False
+            touched.add(i)
+            deltas[:, i], positions[:, i] = self.insertion_column(sol.routes[i], items)
+        return touched
+
+    def greedy_insertion(self, sol, items):
+        return self.repair(sol, items, regret=False)
+
+    def regret_insertion(self, sol, items):
+        return self.repair(sol, items, regret=True)
+
+    def polish(self, sol, touched):
+        for i in touched:
+            sol.routes[i] = two_opt(sol.routes[i], self.d, self.o)
+            sol.lengths[i] = route_length(sol.routes[i], self.d, self.o)
+
+    # search
+
+    def run(self, routes, time_limit, lower_bound=0, max_iterations=None, on_best=None):
+        '''
+        Improves routes until the time limit, max_iterations or a solution matching the
+        lower bound. Returns the best routes, their objective and the iterations done.
+        '''
+        start_time = time.time()
+        current = self.solution(routes)
+        best = current.copy()
+        if best.obj <= lower_bound:
+            return best.routes, best.obj, 0
+
+        weights = np.ones((2, max(len(self.destroy_ops), len(self.repair_ops))))
+        weights[0, len(self.destroy_ops):] = 0
+        weights[1, len(self.repair_ops):] = 0
+        gained = np.zeros_like(weights)
+        used = np.zeros_like(weights)
+        # a 5% worse solution is accepted with probability 1/2 at the start
+        t_start = 0.05 * self.score(current) / math.log(2)
+        t_end = t_start / 1000
+        q_min = min(self.n, 4)
+        q_max = max(q_min, min(60, int(0.35 * self.n)))
+
+        iteration = 0
+        while max_iterations is None or iteration < max_iterations:
+            elapsed = time.time() - start_time
+            if elapsed >= time_limit:
+                break
+            iteration += 1
+            temperature = t_start * (t_end / t_start) ** (elapsed / time_limit)
+
+            a = self.rng.choice(len(self.destroy_ops), p=weights[0, :len(self.destroy_ops)] / weights[0].sum())
+            b = self.rng.choice(len(self.repair_ops), p=weights[1, :len(self.repair_ops)] / weights[1].sum())
+            candidate = current.copy()
+            removed = self.destroy_ops[a](candidate, int(self.rng.integers(q_min, q_max + 1)))
+            touched = self.repair_ops[b](candidate, removed)
+            used[0, a] += 1
+            used[1, b] += 1
+            if touched is None:
+                continue
+            self.polish(candidate, touched)
+
+            gain = 0
+            delta = self.score(candidate) - self.score(current)
+            if self.score(candidate) < self.score(best):
+                candidate = self.solution(rebalance(candidate.routes, self.instance, self.d, self.o))
+                current, best = candidate, candidate.copy()
+                gain = self.SCORES[0]
+                if on_best is not None:
+                    on_best(best.routes, best.obj, time.time() - start_time)
+                if best.obj <= lower_bound:
+                    break
+            elif delta < 0:
+                current, gain = candidate, self.SCORES[1]
+            elif self.rng.random() < math.exp(-delta / temperature):
+                current, gain = candidate, self.SCORES[2]
+            gained[0, a] += gain
+            gained[1, b] += gain
+
+            if iteration % self.SEGMENT == 0:
+                mask = used > 0
+                weights[mask] = (1 - self.REACTION) * weights[mask] + self.REACTION * gained[mask] / used[mask]
+                weights[:, :] = np.where(weights > 0, np.maximum(weights, 1e-3), 0)
+                gained[:] = 0
+                used[:] = 0
+
+        return best.routes, best.obj, iteration
@@ -0,0 +1,72 @@
+import os
+import time
+from common.instance import Instance
+from common.bounds import strongest_bound
+from common.heuristic import heuristic_solution
+from common.results_db import record_result
+from common.incumbent import publish_incumbent
+from .alns import ALNS
+
+INSTANCES_DIR = os.path.abspath('instances')
+MAX_TIME = 300
+SOLVERS = ['alns', 'greedy']    # greedy: the constructive heuristic alone
+
+def choose_instance(instance_name):
+    if int(instance_name) in range(1, 10):
+        instance = f"inst0{instance_name}"
+    elif int(instance_name) in range(10, 22):
+        instance = f"inst{instance_name}"
+    return instance
+
+def solve_instance(instance_name: str, solver_name: str = 'alns', symbreak: bool = False, threads: int = None,
+                   time_limit: int = MAX_TIME, seed: int = 0, incumbent=None):
+    # symbreak and threads are accepted like the other approaches, the search is sequential
+    # incumbent: objective shared by the portfolio pipelines, every new best is published to it
+    if solver_name not in SOLVERS:
+        raise ValueError(f"Unsupported solver: {solver_name}, choose from {', '.join(SOLVERS)}")
+    start_time = time.time()
+    instance = Instance.from_file(INSTANCES_DIR + "/" + choose_instance(instance_name) + ".dat")
+    lower = strongest_bound(instance)
+
+    obj, sol = heuristic_solution(instance)
+    iterations = 0
+    if obj is None:
+        return {'time': MAX_TIME, 'optimal': False, 'obj': -1, 'sol': []}
+    publish_incumbent(incumbent, obj, sol)
+    if solver_name == 'alns' and obj > lower:
+        alns = ALNS(instance, seed=seed)
+        routes, obj, iterations = alns.run(
+            [[item - 1 for item in tour] for tour in sol],
+            time_limit=max(time_limit - (time.time() - start_time), 0),
+            lower_bound=lower,
+            on_best=lambda routes, best, elapsed: publish_incumbent(
+                incumbent, best, [[int(item) + 1 for item in route] for route in routes])
+        )
+        sol = [[item + 1 for item in route] for route in routes]
+
+    elapsed = time.time() - start_time
+    # only reaching the lower bound proves optimality
+    optimal = obj <= lower and elapsed < MAX_TIME
+    return {
+        'time': int(elapsed) if optimal else MAX_TIME,
+        'optimal': optimal,
+        'obj': int(obj),
+        'sol': sol,
+        'iterations': iterations
+    }
+
+def store_result(result, instance_name: str, solver_name: str = 'alns', symbreak: bool = False):
+    record_result('HEUR', choose_instance(instance_name), solver_name, result, solver_name, symbreak)
+
+def execute_heuristic(instance_name: str, solver_name: str = 'alns', symbreak: bool = False,
+                      time_limit: int = MAX_TIME, seed: int = 0):
+    if instance_name == "all":
+        print("Running on all instances...")
+        for i in range(len(os.listdir(INSTANCES_DIR))):
+            execute_heuristic(str(i + 1), solver_name, symbreak, time_limit, seed)
+        return
+
+    print(f"Running {solver_name} on instance {instance_name}...")
+    result = solve_instance(instance_name, solver_name, symbreak, time_limit=time_limit, seed=seed)
+    print(f"obj: {result['obj']}, optimal: {result['optimal']}")
+    store_result(result, instance_name, solver_name, symbreak)
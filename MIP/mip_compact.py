@@ -0,0 +1,191 @@
+import pulp
+import numpy as np
+from common.bounds import strongest_bound
+from common.preprocessing import prune_arcs, shortest_paths
+from .mip_model import solve_model, verify_objective
+
+def build_compact_model(instance, add_symmetry_break=False, lower_bound=None, arcs=None, upper_bound=None):
+    '''
+    Two-index formulation: y[j][k] arcs shared by all couriers, z[i][k] courier i starts its
+    route with item k. Every item carries a load label L, a distance label D and the capacity
+    c of the courier serving it, passed along the arcs with big-M constraints (MTZ-style,
+    L also eliminates the subtours). About (n+1)^2 + m*n variables instead of m*(n+1)^2.
+    '''
+    m = instance.m
+    n = instance.n
+    capacities = instance.capacities.tolist()
+    sizes = instance.sizes.tolist()
+    distances = instance.distances.tolist()
+    o = instance.origin
+
+    if arcs is None:
+        arcs = prune_arcs(instance, upper_bound)
+    allowed = arcs.arcs
+    arc_list = [tuple(arc) for arc in np.argwhere(allowed).tolist()]
+    out_arcs = [np.flatnonzero(allowed[j]).tolist() for j in range(n + 1)]
+    in_arcs = [np.flatnonzero(allowed[:, k]).tolist() for k in range(n + 1)]
+
+    sp = shortest_paths(instance.distances).tolist()
+    max_load = max(capacities)
+    lower = lower_bound if lower_bound is not None else 0
+    upper = upper_bound if upper_bound is not None else int(instance.distances.max()) * (n + 1)
+
+    prob = pulp.LpProblem("MCP_Compact", pulp.LpMinimize)
+
+    # Variables
+    y = {j: {} for j in range(n + 1)}
+    for j, k in arc_list:
+        y[j][k] = pulp.LpVariable(f"y_{j}_{k}", cat='Binary')
+    z = {i: {k: pulp.LpVariable(f"z_{i}_{k}", cat='Binary') for k in range(n) if arcs.allowed[i, o, k]}
+         for i in range(m)}
+    L = {j: pulp.LpVariable(f"L_{j}", lowBound=sizes[j], upBound=max_load) for j in range(n)}
+    D = {j: pulp.LpVariable(f"D_{j}", lowBound=sp[o][j], upBound=max(upper - sp[j][o], sp[o][j])) for j in range(n)}
+    c = {j: pulp.LpVariable(f"c_{j}", lowBound=0, upBound=max_load) for j in range(n)}
+    Z = pulp.LpVariable("Z", lowBound=lower, upBound=upper, cat='Continuous')
+
+    # Objective - minimize max distance per courier
+    prob += Z
+
+    # Every item is entered and left once
+    for j in range(n):
+        prob += pulp.lpSum(y[k][j] for k in in_arcs[j]) == 1
+        prob += pulp.lpSum(y[j][k] for k in out_arcs[j]) == 1
+
+    # Every route leaving the depot comes back and belongs to a different courier
+    prob += pulp.lpSum(y[o][k] for k in out_arcs[o]) == pulp.lpSum(y[j][o] for j in in_arcs[o])
+    for k in out_arcs[o]:
+        prob += pulp.lpSum(z[i][k] for i in range(m) if k in z[i]) == y[o][k]
+    for i in range(m):
+        prob += pulp.lpSum(z[i].values()) <= 1
+
+    for j, k in arc_list:
+        if j == o:
+            # first item: load, distance and the capacity of the courier starting there
+            prob += D[k] >= distances[o][k] * y[o][k]
+            prob += c[k] <= pulp.lpSum(capacities[i] * z[i][k] for i in range(m) if k in z[i]) + max_load * (1 - y[o][k])
+        elif k == o:
+            # last item: the route length bounds Z
+            prob += Z >= D[j] + distances[j][o] - (upper - sp[j][o] + distances[j][o] - lower) * (1 - y[j][o])
+        else:
+            # labels passed along the arc
+            prob += L[k] >= L[j] + sizes[k] - max_load * (1 - y[j][k])
+            prob += D[k] >= D[j] + distances[j][k] - (upper - sp[j][o] + distances[j][k] - sp[o][k]) * (1 - y[j][k])
+            prob += c[k] <= c[j] + max_load * (1 - y[j][k])
+
+    # Respect capacity limits
+    for j in range(n):
+        prob += L[j] <= c[j]
+
+    # Optional symmetry breaking: identical couriers ordered by use and by first item
+    if add_symmetry_break:
+        groups = {}
+        for i in range(m):
+            groups.setdefault(capacities[i], []).append(i)
+        for group in groups.values():
+            for curr, nxt in zip(group[:-1], group[1:]):
+                prob += pulp.lpSum(z[curr].values()) >= pulp.lpSum(z[nxt].values())
+                prob += pulp.lpSum((k + 1) * z[curr][k] for k in z[curr]) >= pulp.lpSum((k + 1) * z[nxt][k] for k in z[nxt])
+
+    variables = {'y': y, 'z': z, 'L': L, 'D': D, 'c': c, 'Z': Z,
+                 # what solve_in_memory reads back: (shape, value of the variables left out of the model)
+                 'read': {'y': ((n + 1, n + 1), 0), 'z': ((m, n), 0)}}
+    return prob, variables
+
+def compact_start_values(instance, sol, add_symmetry_break=False):
+    # values of the compact model variables for a solution in the results format (items from 1)
+    from .mip_model import start_values
+
+    values = start_values(instance, sol, add_symmetry_break)
+    m, n, o = instance.m, instance.n, instance.origin
+    sizes, capacities, d = instance.sizes, instance.capacities, instance.distances
+    y = values['y'].sum(axis=0)
+    z = values['y'][:, o, :n]
+    L, D, c = np.zeros(n), np.zeros(n), np.zeros(n)
+    tours = [[] for _ in range(m)]
+    for i in range(m):
+        k = np.flatnonzero(z[i])
+        while len(k) and k[0] != o:
+            tours[i].append(int(k[0]))
+            k = np.flatnonzero(values['y'][i, k[0]])
+    if add_symmetry_break:
+        # start_values sorted identical couriers by load, the compact model wants them by first item
+        for cap in np.unique(capacities):
+            group = np.flatnonzero(capacities == cap)
+            first = [tours[i][0] + 1 if tours[i] else 0 for i in group]
+            order = group[np.argsort(first, kind='stable')[::-1]]
+            tours_group = [tours[i] for i in order]
+            for i, tour in zip(group, tours_group):
+                tours[i] = tour
+        z = np.zeros((m, n))
+    for i, tour in enumerate(tours):
+        if not tour:
+            continue
+        z[i, tour[0]] = 1
+        route = [o] + tour
+        L[tour] = np.cumsum(sizes[tour])
+        D[tour] = np.cumsum(d[route[:-1], route[1:]])
+        c[tour] = capacities[i]
+    return {'y': y, 'z': z, 'L': L, 'D': D, 'c': c, 'Z': values['Z']}
+
+def set_compact_start(variables, values):
+    for j in variables['y']:
+        for k in variables['y'][j]:
+            variables['y'][j][k].setInitialValue(values['y'][j, k])
+    for i in variables['z']:
+        for k in variables['z'][i]:
+            variables['z'][i][k].setInitialValue(values['z'][i, k])
+    for name in ('L', 'D', 'c'):
+        for j, var in variables[name].items():
+            var.setInitialValue(values[name][j])
+    variables['Z'].setInitialValue(values['Z'])
+
+def reconstruct_compact_tours(solution, variables, instance):
+    m, n, o = instance.m, instance.n, instance.origin
+    if 'y' in solution:
+        y, z = solution['y'] > 0.5, solution['z'] > 0.5
+    else:
+        y = np.zeros((n + 1, n + 1), dtype=bool)
+        z = np.zeros((m, n), dtype=bool)
+        for j in variables['y']:
+            for k, var in variables['y'][j].items():
+                y[j, k] = (var.value() or 0) > 0.5
+        for i in variables['z']:
+            for k, var in variables['z'][i].items():
+                z[i, k] = (var.value() or 0) > 0.5
+
+    tours = []
+    for i in range(m):
+        tour = []
+        k = np.flatnonzero(z[i])
+        while len(k) and k[0] != o and len(tour) < n:
+            tour.append(int(k[0]) + 1)
+            k = np.flatnonzero(y[k[0]])
+        tours.append(tour)
+    return tours
+
+def solve_mcp_compact(instance, time_limit_sec=305, add_symmetry_break=False, solver="HiGHS_CMD", threads=None,
+                      arcs=None, upper_bound=None, initial_solution=None, lower_bound=None):
+    if lower_bound is None:
+        lower_bound = strongest_bound(instance)
+    start = None
+    if initial_solution is not None:
+        start = compact_start_values(instance, initial_solution, add_symmetry_break)
+        upper_bound = start['Z'] if upper_bound is None else min(upper_bound, start['Z'])
+
+    model, variables = build_compact_model(instance, add_symmetry_break, lower_bound, arcs, upper_bound)
+    if start is not None:
+        set_compact_start(variables, start)
+    solution = solve_model(model, variables, solver, time_limit_sec, threads, warm_start=start is not None)
+
+    results = {
+        'time': solution['solve_time'],
+        'optimal': solution['is_optimal'],
+        'obj': int(round(solution['objective'])) if solution['objective'] is not None else -1,
+        'sol': []
+    }
+
+    if solution['objective'] is not None and solution['objective'] >= 0:
+        results['sol'] = reconstruct_compact_tours(solution, variables, instance)
+        verify_objective(results, instance)
+
+    return results
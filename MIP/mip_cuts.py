@@ -0,0 +1,179 @@
+import time
+import numpy as np
+from common.heuristic import nearest_neighbour, two_opt
+from .mip_matrix import solve_highs
+
+MAX_ROOT_ROUNDS = 50       # cut rounds on the LP relaxation before branching (fractional separation)
+
+def y_values(values, model):
+    m, n = model.m, model.n
+    start = model.y_col(0, 0, 0)
+    return values[start:start + m * (n + 1) ** 2].reshape(m, n + 1, n + 1)
+
+def find_subtours(values, model, threshold=0.5):
+    '''
+    Sets of items S whose arcs, over all couriers, break sum y(S) <= |S| - 1: the connected
+    components of the arcs above threshold (per courier) that don't reach the depot. With the
+    default threshold the exact separation for integer solutions, with a small one a cheap
+    heuristic for fractional ones.
+    '''
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    y = y_values(values, model)
+    total = y[:, :model.n, :model.n].sum(axis=0)
+    found = {}
+    for i in range(model.m):
+        _, labels = connected_components(csr_matrix(y[i] > threshold), directed=True, connection='weak')
+        for label in np.unique(labels):
+            if label == labels[model.n]:
+                continue
+            S = np.flatnonzero(labels == label)
+            if len(S) > 1 and total[np.ix_(S, S)].sum() > len(S) - 1 + 1e-6:
+                found[tuple(S)] = S
+    return list(found.values())
+
+def subtour_rows(subtours, model):
+    '''
+    sum_i sum_{j, k in S} y[i][j][k] <= |S| - 1 as CSR rows: the arcs inside S, whatever the
+    courier, form paths, so one row per S is valid and implies the per-courier rows.
+    '''
+    start, index = [0], []
+    for S in subtours:
+        cols = np.array([model.y_col(i, j, k) for i in range(model.m) for j in S for k in S if j != k])
+        # pruned arcs are fixed to 0
+        cols = cols[model.col_upper[cols] > 0]
+        index.append(cols)
+        start.append(start[-1] + len(cols))
+    index = np.concatenate(index).astype(np.int32)
+    upper = np.array([len(S) - 1 for S in subtours], dtype=np.float64)
+    return np.array(start, dtype=np.int32), index, np.ones(len(index)), upper
+
+def tour_vector(tours, model):
+    # column values of tours (items from 0) without MTZ: x, y along the tours, Z the longest; None if a tour uses a pruned arc
+    n = model.n
+    d = model.distances
+    values = np.zeros(model.num_col)
+    lengths = [0]
+    for i, tour in enumerate(tours):
+        if not tour:
+            continue
+        route = np.array([n] + list(tour) + [n])
+        values[[model.x_col(i, j) for j in tour]] = 1
+        values[[model.y_col(i, j, k) for j, k in zip(route[:-1], route[1:])]] = 1
+        lengths.append(int(d[route[:-1], route[1:]].sum()))
+    values[model.z_col()] = max(lengths)
+    if np.any(values > model.col_upper) or np.any(values < model.col_lower):
+        return None
+    return values
+
+def patch_subtours(values, model):
+    # the assignment of a solution with subtours, every courier's items routed again by nearest neighbour and 2-opt
+    m, n = model.m, model.n
+    d = model.distances.astype(np.int64)
+    x = values[:m * n].reshape(m, n) > 0.5
+    return tour_vector([two_opt(nearest_neighbour(np.flatnonzero(x[i]).tolist(), d, n), d, n) for i in range(m)],
+                       model)
+
+def add_highs_rows(h, subtours, model):
+    start, index, value, upper = subtour_rows(subtours, model)
+    h.addRows(len(subtours), np.full(len(subtours), -np.inf), upper, len(index), start[:-1], index, value)
+
+def solve_highs_lazy(h, model, deadline, fractional=False, start=None):
+    '''
+    HiGHS has no lazy constraint callback: the MIP is solved without subtour elimination,
+    the subtours of the solution are cut off and the MIP solved again, until a solution
+    has none. fractional: cut rounds on the LP relaxation first.
+    Every solve starts from the best subtour-free solution so far: the MIP start, or a
+    solution with subtours whose assignment is routed again (patch_subtours). It is the
+    result, not optimal, when the time runs out with subtours left, and optimal when it
+    reaches the lower bound on Z. The branch and bound itself restarts every round, so
+    on the larger instances MTZ is usually faster.
+    '''
+    cuts, rounds = 0, 0
+    best = start
+    Z = model.z_col()
+    if fractional:
+        integer = np.flatnonzero(model.integrality == 1).astype(np.int32)
+        h.changeColsIntegrality(len(integer), integer, np.zeros(len(integer), dtype=np.uint8))
+        for _ in range(MAX_ROOT_ROUNDS):
+            h.setOptionValue('time_limit', max(deadline - time.time(), 1))
+            h.run()
+            subtours = find_subtours(np.asarray(h.getSolution().col_value), model, threshold=1e-6)
+            if not subtours:
+                break
+            add_highs_rows(h, subtours, model)
+            cuts += len(subtours)
+        h.changeColsIntegrality(len(integer), integer, np.ones(len(integer), dtype=np.uint8))
+
+    while True:
+        h.setOptionValue('time_limit', max(deadline - time.time(), 1))
+        if best is not None:
+            h.setSolution(model.num_col, np.arange(model.num_col, dtype=np.int32), best)
+        solution = solve_highs(h)
+        rounds += 1
+        if solution['values'] is None:
+            if best is not None:
+                solution.update(is_optimal=False, objective=best[Z], values=best)
+            break
+        subtours = find_subtours(solution['values'], model)
+        if not subtours:
+            if not solution['is_optimal'] and best is not None and best[Z] < solution['objective']:
+                # stopped by the time limit short of the patched solution: keep the better one
+                solution.update(objective=best[Z], values=best)
+            break
+        patched = patch_subtours(solution['values'], model)
+        if patched is not None and (best is None or patched[Z] < best[Z]):
+            best = patched
+        if best is not None and best[Z] <= model.col_lower[Z]:
+            # the lower bound is reached: optimal whatever the cuts left to add
+            solution.update(is_optimal=True, objective=best[Z], values=best)
+            break
+        if time.time() >= deadline:
+            # out of time with subtours left: the best subtour-free solution, not optimal
+            solution.update(is_optimal=False, objective=best[Z] if best is not None else None, values=best)
+            break
+        add_highs_rows(h, subtours, model)
+        cuts += len(subtours)
+
+    solution.update(cuts=cuts, rounds=rounds)
+    return solution
+
+def solve_gurobi_lazy(g, model, deadline=None, fractional=False, start=None):
+    # subtours cut off as lazy constraints on every incumbent (and every node relaxation with fractional)
+    import gurobipy as gp
+    from gurobipy import GRB
+
+    variables = g.getVars()
+    g.Params.LazyConstraints = 1
+    cuts = [0]
+
+    def add_cuts(g, values, threshold):
+        subtours = find_subtours(np.asarray(values), model, threshold)
+        start, index, value, upper = subtour_rows(subtours, model) if subtours else ([], [], [], [])
+        for r in range(len(subtours)):
+            cols = index[start[r]:start[r + 1]]
+            g.cbLazy(gp.LinExpr(value[start[r]:start[r + 1]].tolist(), [variables[c] for c in cols]) <= upper[r])
+        cuts[0] += len(subtours)
+
+    def callback(g, where):
+        if where == GRB.Callback.MIPSOL:
+            add_cuts(g, g.cbGetSolution(variables), 0.5)
+        elif fractional and where == GRB.Callback.MIPNODE and g.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL:
+            add_cuts(g, g.cbGetNodeRel(variables), 1e-6)
+
+    g.optimize(callback)
+    has_solution = g.SolCount > 0
+    return {
+        'status': str(g.Status),
+        'is_optimal': g.Status == GRB.OPTIMAL,
+        'objective': g.ObjVal if has_solution else None,
+        'values': np.array(g.getAttr('X', variables)) if has_solution else None,
+        'cuts': cuts[0],
+        'rounds': 1,
+    }
+
+LAZY_SOLVERS = {
+    'highs': solve_highs_lazy,
+    'gurobi': solve_gurobi_lazy,
+}
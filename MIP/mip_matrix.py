@@ -0,0 +1,137 @@
+import time
+import numpy as np
+from common.bounds import strongest_bound
+from common.matrix import build_mcp_arrays, highs_model
+
+def start_vector(values):
+    # start_values in the column layout: x | y | u | Z
+    return np.concatenate([values['x'].ravel(), values['y'].ravel(), values['u'].ravel(), [values['Z']]])
+
+def solve_highs(h):
+    import highspy
+
+    h.run()
+    status = h.getModelStatus()
+    values = np.asarray(h.getSolution().col_value)
+    has_solution = h.getInfo().primal_solution_status == 2     # kSolutionStatusFeasible
+    return {
+        'status': h.modelStatusToString(status),
+        'is_optimal': status == highspy.HighsModelStatus.kOptimal,
+        'objective': h.getInfo().objective_function_value if has_solution else None,
+        'values': values if has_solution else None,
+    }
+
+def gurobi_model(model, time_limit_sec=305, threads=None, start=None):
+    import gurobipy as gp
+    import scipy.sparse as sp
+
+    g = gp.Model()
+    g.Params.OutputFlag = 0
+    g.Params.TimeLimit = time_limit_sec
+    if threads is not None:
+        g.Params.Threads = threads
+    vtype = np.where(model.integrality == 1, gp.GRB.INTEGER, gp.GRB.CONTINUOUS)
+    # the integer 0/1 columns are binaries
+    vtype[(model.integrality == 1) & (model.col_lower == 0) & (model.col_upper <= 1)] = gp.GRB.BINARY
+    v = g.addMVar(model.num_col, lb=model.col_lower, ub=model.col_upper, obj=model.cost, vtype=vtype)
+    A = sp.csr_matrix((model.value, model.index, model.start), shape=(model.num_row, model.num_col))
+    eq = model.row_lower == model.row_upper
+    le = ~eq & np.isinf(model.row_lower)
+    ge = ~eq & ~le
+    g.addMConstr(A[eq], v, '=', model.row_upper[eq])
+    g.addMConstr(A[le], v, '<', model.row_upper[le])
+    g.addMConstr(A[ge], v, '>', model.row_lower[ge])
+    if start is not None:
+        v.Start = start
+    g.update()
+    return g
+
+def solve_gurobi(g):
+    import gurobipy as gp
+
+    g.optimize()
+    has_solution = g.SolCount > 0
+    return {
+        'status': str(g.Status),
+        'is_optimal': g.Status == gp.GRB.OPTIMAL,
+        'objective': g.ObjVal if has_solution else None,
+        'values': np.array(g.getAttr('X', g.getVars())) if has_solution else None,
+    }
+
+SOLVERS = {
+    'highs': (highs_model, solve_highs),
+    'gurobi': (gurobi_model, solve_gurobi),
+}
+
+def reconstruct_tours(values, model):
+    m, n = model.m, model.n
+    x = values[:m * n].reshape(m, n) > 0.5
+    u = values[model.u_col(0, 0):model.u_col(0, 0) + m * n].reshape(m, n)
+    tours = []
+    for i in range(m):
+        items = np.flatnonzero(x[i])
+        tours.append((items[np.argsort(u[i, items], kind='stable')] + 1).tolist())
+    return tours
+
+def follow_arcs(values, model):
+    # tours read along the y arcs from the depot (no u without MTZ)
+    m, n = model.m, model.n
+    y = values[model.y_col(0, 0, 0):model.y_col(0, 0, 0) + m * (n + 1) ** 2].reshape(m, n + 1, n + 1) > 0.5
+    tours = []
+    for i in range(m):
+        tour = []
+        k = np.flatnonzero(y[i, n])
+        while len(k) and k[0] != n and len(tour) < n:
+            tour.append(int(k[0]) + 1)
+            k = np.flatnonzero(y[i, k[0]])
+        tours.append(tour)
+    return tours
+
+def solve_mcp_mip_matrix(instance, time_limit_sec=305, add_symmetry_break=False, solver="highs", threads=None,
+                         arcs=None, upper_bound=None, initial_solution=None, lower_bound=None,
+                         subtours='mtz', fractional_cuts=False):
+    from .mip_model import verify_objective, print_timings, start_values
+
+    if lower_bound is None:
+        lower_bound = strongest_bound(instance)
+    timings = {}
+    start_time = time.time()
+    # initial_solution: tours (results format) passed to the solver as MIP start
+    start = None
+    if initial_solution is not None:
+        values = start_values(instance, initial_solution, add_symmetry_break)
+        upper_bound = values['Z'] if upper_bound is None else min(upper_bound, values['Z'])
+        start = start_vector(values)
+    model = build_mcp_arrays(instance, add_symmetry_break, lower_bound, arcs, upper_bound, subtours)
+    if start is not None:
+        # columns fixed by the model (u without MTZ) keep their bound
+        start = np.clip(start, model.col_lower, model.col_upper)
+    to_solver, solve = SOLVERS[solver]
+    solver_model = to_solver(model, max(time_limit_sec - (time.time() - start_time), 1), threads, start)
+    timings['write'] = time.time() - start_time
+    if subtours == 'lazy':
+        from .mip_cuts import LAZY_SOLVERS
+        solution = LAZY_SOLVERS[solver](solver_model, model, start_time + time_limit_sec, fractional_cuts, start)
+    else:
+        solution = solve(solver_model)
+    solve_time = time.time() - start_time
+    timings['solve'] = solve_time - timings['write']
+
+    print("DEBUG: Solver status:", solution['status'])
+
+    results = {
+        'time': int(solve_time) if solve_time < 300 else 300,
+        'optimal': solution['is_optimal'] if solve_time < 300 else False,
+        'obj': int(round(solution['objective'])) if solution['objective'] is not None else -1,
+        'sol': []
+    }
+    phase_start = time.time()
+    if solution['values'] is not None:
+        results['sol'] = follow_arcs(solution['values'], model) if subtours == 'lazy' else reconstruct_tours(solution['values'], model)
+        verify_objective(results, instance)
+    timings['read'] = time.time() - phase_start
+    print_timings(timings)
+    # lazy subtour elimination: cuts added and MIP solves
+    results.update({key: solution[key] for key in ('cuts', 'rounds') if key in solution})
+
+    return results
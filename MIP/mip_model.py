@@ -1,24 +1,36 @@
 import pulp
 import time
-from .mip_utils import generate_lowerbound
-
-def build_mcp_model(params, add_symmetry_break=False, lower_bound=None):
-    m = params['m']
-    n = params['n']
-    capacities = params['capacities']
-    sizes = params['sizes']
-    distances = params['distances']
-    origin_idx = params['origin_idx']
+import numpy as np
+from common.bounds import strongest_bound
+from common.preprocessing import prune_arcs
+
+def build_mcp_model(instance, add_symmetry_break=False, lower_bound=None, arcs=None, upper_bound=None):
+    m = instance.m
+    n = instance.n
+    # plain python numbers for the PuLP expressions
+    capacities = instance.capacities.tolist()
+    sizes = instance.sizes.tolist()
+    distances = instance.distances.tolist()
+    origin_idx = instance.origin
 
     courier_indices = range(m)
     item_indices = range(n)
     all_loc_indices = range(n + 1)
+    # y only for the arcs left by the preprocessing (never the self loops, they mess up MTZ)
+    if arcs is None:
+        arcs = prune_arcs(instance, upper_bound)
+    arc_list = {i: [tuple(arc) for arc in np.argwhere(arcs.allowed[i]).tolist()] for i in courier_indices}
+    out_arcs = {i: [arcs.out_arcs(i, j) for j in all_loc_indices] for i in courier_indices}
+    in_arcs = {i: [arcs.in_arcs(i, k) for k in all_loc_indices] for i in courier_indices}
 
     prob = pulp.LpProblem("MCP_Problem", pulp.LpMinimize)
 
     # Variables
     x = pulp.LpVariable.dicts("x", (courier_indices, item_indices), cat='Binary')
-    y = pulp.LpVariable.dicts("y", (courier_indices, all_loc_indices, all_loc_indices), cat='Binary')
+    y = {i: {j: {} for j in all_loc_indices} for i in courier_indices}
+    for i in courier_indices:
+        for j, k in arc_list[i]:
+            y[i][j][k] = pulp.LpVariable(f"y_{i}_{j}_{k}", cat='Binary')
     u = pulp.LpVariable.dicts("u", (courier_indices, item_indices), lowBound=1, upBound=n, cat='Integer')
     Z = pulp.LpVariable("Z", lowBound=0, cat='Continuous')
 
@@ -28,6 +40,10 @@ def build_mcp_model(params, add_symmetry_break=False, lower_bound=None):
     # Add lower bound constraint if provided
     if lower_bound is not None:
         prob += Z >= lower_bound
+
+    # Add upper bound constraint (heuristic solution) if provided
+    if upper_bound is not None:
+        prob += Z <= upper_bound
         
     # Assign each item to exactly one courier
     for j in item_indices:
@@ -39,40 +55,37 @@ def build_mcp_model(params, add_symmetry_break=False, lower_bound=None):
 
     for i in courier_indices:
         # Courier leaves the depot at most once
-        prob += pulp.lpSum(y[i][origin_idx][k] for k in item_indices) <= 1
+        depot_out = pulp.lpSum(y[i][origin_idx][k] for k in out_arcs[i][origin_idx])
+        prob += depot_out <= 1
 
         # Only leave depot if you have items
-        prob += pulp.lpSum(y[i][origin_idx][k] for k in item_indices) <= pulp.lpSum(x[i][j] for j in item_indices)
+        prob += depot_out <= pulp.lpSum(x[i][j] for j in item_indices)
 
         # Ensure round trip (same in and out arcs at depot)
-        prob += pulp.lpSum(y[i][origin_idx][k] for k in item_indices) == pulp.lpSum(y[i][k][origin_idx] for k in item_indices)
+        prob += depot_out == pulp.lpSum(y[i][k][origin_idx] for k in in_arcs[i][origin_idx])
 
-        # Flow conservation
+        # Flow conservation (no arc left means the item can't go to courier i)
         for j in item_indices:
-            prob += pulp.lpSum(y[i][k][j] for k in all_loc_indices if k != j) == x[i][j]
-            prob += pulp.lpSum(y[i][j][k] for k in all_loc_indices if k != j) == x[i][j]
-
-        # No self-loops (they mess up MTZ)
-        for j in all_loc_indices:
-            prob += y[i][j][j] == 0
+            prob += pulp.lpSum(y[i][k][j] for k in in_arcs[i][j]) == x[i][j]
+            prob += pulp.lpSum(y[i][j][k] for k in out_arcs[i][j]) == x[i][j]
 
     # Subtour elimination (MTZ-style)
     for i in courier_indices:
-        for j in item_indices:
-            for k in item_indices:
-                if j != k:
-                    prob += u[i][j] - u[i][k] + n * y[i][j][k] <= n - 1
+        for j, k in arc_list[i]:
+            if j != origin_idx and k != origin_idx:
+                prob += u[i][j] - u[i][k] + n * y[i][j][k] <= n - 1
 
     # Z should bound each courier's total distance
     for i in courier_indices:
-        courier_distance = pulp.lpSum(distances[j, k] * y[i][j][k] for j in all_loc_indices for k in all_loc_indices if j != k)
+        courier_distance = pulp.lpSum(distances[j][k] * y[i][j][k] for j, k in arc_list[i])
         prob += courier_distance <= Z
 
     # Optional symmetry breaking
     if add_symmetry_break:
         add_symmetry_breaking(prob, x, courier_indices, item_indices, capacities, sizes)
 
-    return prob, {'x': x, 'y': y, 'u': u, 'Z': Z}
+    # what solve_in_memory reads back: (shape, value of the variables left out of the model)
+    return prob, {'x': x, 'y': y, 'u': u, 'Z': Z, 'read': {'x': ((m, n), 0), 'u': ((m, n), 1)}}
 
 def add_symmetry_breaking(prob, x, courier_indices, item_indices, capacities, sizes):
     identical_groups = {}
@@ -89,58 +102,209 @@ def add_symmetry_breaking(prob, x, courier_indices, item_indices, capacities, si
                 load_next = pulp.lpSum(sizes[j] * x[next_courier][j] for j in item_indices)
                 prob += load_curr >= load_next
 
-def solve_model(model, variables, solver_name, time_limit_sec=305):
+def start_values(instance, sol, add_symmetry_break=False):
+    '''
+    Values of x, y, u (arrays, as in the model) and Z for a solution in the results
+    format (items from 1). With symmetry breaking, identical couriers swap tours so
+    that their loads are sorted as the model requires.
+    '''
+    m, n, o = instance.m, instance.n, instance.origin
+    tours = [[item - 1 for item in tour] for tour in sol]
+    if add_symmetry_break:
+        loads = np.array([instance.sizes[tour].sum() for tour in tours])
+        for cap in np.unique(instance.capacities):
+            group = np.flatnonzero(instance.capacities == cap)
+            by_load = group[np.argsort(-loads[group], kind='stable')]
+            for i, tour in zip(group, [tours[k] for k in by_load]):
+                tours[i] = tour
+
+    x = np.zeros((m, n))
+    y = np.zeros((m, n + 1, n + 1))
+    u = np.ones((m, n))
+    Z = 0
+    for i, tour in enumerate(tours):
+        if not tour:
+            continue
+        route = np.array([o] + tour + [o])
+        x[i, tour] = 1
+        y[i, route[:-1], route[1:]] = 1
+        u[i, tour] = np.arange(1, len(tour) + 1)
+        Z = max(Z, int(instance.distances[route[:-1], route[1:]].sum()))
+    return {'x': x, 'y': y, 'u': u, 'Z': Z}
+
+def set_start(variables, values):
+    # initial values of the PuLP variables, passed to the solver with warmStart
+    x, y, u = variables['x'], variables['y'], variables['u']
+    for i in x:
+        for j in x[i]:
+            x[i][j].setInitialValue(values['x'][i, j])
+            u[i][j].setInitialValue(values['u'][i, j])
+        for j in y[i]:
+            for k in y[i][j]:
+                y[i][j][k].setInitialValue(values['y'][i, j, k])
+    variables['Z'].setInitialValue(values['Z'])
+
+def timed(phase, timings, function):
+    def wrapper(*args, **kwargs):
+        start_time = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timings[phase] = timings.get(phase, 0) + time.time() - start_time
+    return wrapper
+
+def solve_model(model, variables, solver_name, time_limit_sec=305, threads=None, warm_start=False):
+    # threads=None leaves the solver default (Gurobi uses every core)
+    # warm_start: the initial values of the variables are passed as MIP start
     solver_map = {
-        "GUROBI_CMD": pulp.GUROBI_CMD(timeLimit=time_limit_sec, msg=False),
-        "HiGHS_CMD": pulp.HiGHS_CMD(timeLimit=time_limit_sec, msg=False),
+        # through files: the model is written to disk, solved by the binary and the solution file read back
+        "GUROBI_CMD": lambda: pulp.GUROBI_CMD(timeLimit=time_limit_sec, msg=False, threads=threads,
+                                              warmStart=warm_start),
+        "HiGHS_CMD": lambda: pulp.HiGHS_CMD(timeLimit=time_limit_sec, msg=False, threads=threads,
+                                            warmStart=warm_start),
+        # in memory, through gurobipy/highspy
+        "GUROBI": lambda: pulp.GUROBI(timeLimit=time_limit_sec, msg=False, warmStart=warm_start,
+                                      **({'Threads': threads} if threads is not None else {})),
+        "HiGHS": lambda: pulp.HiGHS(timeLimit=time_limit_sec, msg=False, threads=threads),
     }
 
     if solver_name not in solver_map:
         raise ValueError(f"Unsupported solver: {solver_name}")
+    solver = solver_map[solver_name]()
+    if solver_name in ("GUROBI", "HiGHS"):
+        return solve_in_memory(model, variables, solver, warm_start)
+
+    # time spent writing the model file and reading the solution file
+    timings = {}
+    model.writeMPS = timed('write', timings, model.writeMPS)
+    model.writeLP = timed('write', timings, model.writeLP)
+    solver.readsol = timed('read', timings, solver.readsol)
 
     start_time = time.time()
-    model.solve(solver_map[solver_name])
+    model.solve(solver)
     solve_time = time.time() - start_time
+    timings['solve'] = solve_time - timings.get('write', 0) - timings.get('read', 0)
 
     print("DEBUG: Solver status:", pulp.LpStatus[model.status])
+    print_timings(timings)
     
     return {
         'status': pulp.LpStatus[model.status],
         'solve_time': int(solve_time) if solve_time < 300 else 300,
         'objective': None if model.status != pulp.LpStatusOptimal else pulp.value(model.objective),
         'is_optimal': model.status == pulp.LpStatusOptimal if solve_time < 300 else False,
-        'variables': variables
+        'variables': variables,
+        'timings': timings
     }
 
-def reconstruct_tours(solution, variables, params):
-    if not solution['objective']:
-        return [[] for _ in range(params['m'])]
+def solve_in_memory(model, variables, solver, warm_start=False):
+    timings = {}
+    start_time = time.time()
 
-    x, u = variables['x'], variables['u']
-    m, n = params['m'], params['n']
-    tours = [[] for _ in range(m)]
+    # write: the PuLP model is copied into the solver
+    if isinstance(solver, pulp.HiGHS):
+        solver.createAndConfigureSolver(model)
+    solver.buildSolverModel(model)
+    if warm_start and isinstance(solver, pulp.HiGHS):
+        # PuLP has no warmStart for highspy: the start goes in as a (sparse) solution
+        start = [(var.index, var.varValue) for var in model.variables()
+                 if var.varValue is not None and hasattr(var, 'index')]
+        model.solverModel.setSolution(len(start), np.array([c for c, _ in start], dtype=np.int32),
+                                      np.array([v for _, v in start], dtype=np.float64))
+    timings['write'] = time.time() - start_time
+
+    phase_start = time.time()
+    solver.callSolver(model)
+    timings['solve'] = time.time() - phase_start
+
+    # read: the solution comes back as a vector, in the order of model.variables()
+    phase_start = time.time()
+    if isinstance(solver, pulp.HiGHS):
+        import highspy
+        h = model.solverModel
+        status = h.getModelStatus()
+        is_optimal = status == highspy.HighsModelStatus.kOptimal
+        has_solution = h.getInfo().primal_solution_status == 2     # kSolutionStatusFeasible
+        objective = h.getInfo().objective_function_value
+        values = np.asarray(h.getSolution().col_value)
+        column = lambda var: getattr(var, 'index', -1)
+        status = h.modelStatusToString(status)
+    else:
+        import gurobipy as gp
+        g = model.solverModel
+        is_optimal = g.Status == gp.GRB.OPTIMAL
+        has_solution = g.SolCount > 0
+        objective = g.ObjVal if has_solution else None
+        values = np.array(g.getAttr('X', g.getVars())) if has_solution else None
+        column = lambda var: var.solverVar.index if hasattr(var, 'solverVar') else -1
+        status = str(g.Status)
+
+    solution = {
+        'status': status,
+        'objective': objective if has_solution else None,
+        'is_optimal': is_optimal,
+        'variables': variables,
+    }
+    if has_solution:
+        # variables in no constraint aren't passed to the solver, their column is -1: the u of an item
+        # with no arc to other items (alone in the route, if delivered) reads its lower bound
+        for key, (shape, missing) in variables['read'].items():
+            cols = np.full(shape, -1)
+            for i, row in variables[key].items():
+                for j, var in row.items():
+                    cols[i, j] = column(var)
+            solution[key] = np.where(cols < 0, missing, values[cols])
+    timings['read'] = time.time() - phase_start
+
+    solve_time = time.time() - start_time
+    solution['solve_time'] = int(solve_time) if solve_time < 300 else 300
+    solution['is_optimal'] = is_optimal if solve_time < 300 else False
+    solution['timings'] = timings
 
-    # Get assignments - trust the solver
+    print("DEBUG: Solver status:", status)
+    print_timings(timings)
+    return solution
+
+def print_timings(timings):
+    print("DEBUG: Timings: " + ", ".join(f"{phase} {timings.get(phase, 0):.2f}s" for phase in ('write', 'solve', 'read')))
+
+def reconstruct_tours(solution, variables, instance):
+    if not solution['objective']:
+        return [[] for _ in range(instance.m)]
+
+    m, n = instance.m, instance.n
+    if 'x' in solution:
+        # values already extracted as (m, n) arrays
+        x_val, u_val = solution['x'], solution['u']
+    else:
+        x, u = variables['x'], variables['u']
+        x_val = np.array([[x[i][j].value() or 0 for j in range(n)] for i in range(m)])
+        # u in no constraint isn't in the solution file: its lower bound
+        u_val = np.array([[u[i][j].value() or 1 for j in range(n)] for i in range(m)])
+
+    # Get assignments - trust the solver, sort by position and build tour
+    tours = []
     for i in range(m):
-        assigned_items = []
-        for j in range(n):
-            if x[i][j].value() > 0.5:
-                pos = u[i][j].value()
-                if pos:
-                    assigned_items.append((j + 1, pos))
-        
-        # Sort by position and build tour
-        assigned_items.sort(key=lambda item: item[1])
-        tours[i] = [item[0] for item in assigned_items]
+        items = np.flatnonzero((x_val[i] > 0.5) & (u_val[i] > 0))
+        tours.append((items[np.argsort(u_val[i, items], kind='stable')] + 1).tolist())
 
     return tours
 
-def solve_mcp_mip(params, time_limit_sec=305, add_symmetry_break=False, solver="HiGHS_CMD"):
+def solve_mcp_mip(instance, time_limit_sec=305, add_symmetry_break=False, solver="HiGHS_CMD", threads=None,
+                  arcs=None, upper_bound=None, initial_solution=None, lower_bound=None):
 
-    lower_bound = generate_lowerbound(params['distances'], params['n'], params['origin_idx'])
+    if lower_bound is None:
+        lower_bound = strongest_bound(instance)
+    # initial_solution: tours (results format) passed to the solver as MIP start
+    start = None
+    if initial_solution is not None:
+        start = start_values(instance, initial_solution, add_symmetry_break)
+        upper_bound = start['Z'] if upper_bound is None else min(upper_bound, start['Z'])
 
-    model, variables = build_mcp_model(params, add_symmetry_break, lower_bound)
-    solution = solve_model(model, variables, solver, time_limit_sec)
+    model, variables = build_mcp_model(instance, add_symmetry_break, lower_bound, arcs, upper_bound)
+    if start is not None:
+        set_start(variables, start)
+    solution = solve_model(model, variables, solver, time_limit_sec, threads, warm_start=start is not None)
 
     results = {
         'time': solution['solve_time'],
@@ -150,17 +314,17 @@ def solve_mcp_mip(params, time_limit_sec=305, add_symmetry_break=False, solver="
     }
 
     if solution['objective'] is not None and solution['objective'] >= 0:
-        results['sol'] = reconstruct_tours(solution, variables, params)
-        verify_objective(results, params)
+        results['sol'] = reconstruct_tours(solution, variables, instance)
+        verify_objective(results, instance)
 
     return results
 
-def verify_objective(result, params):
+def verify_objective(result, instance):
     if not result['sol']:
         return
 
-    distances = params['distances']
-    depot = params['origin_idx']
+    distances = instance.distances
+    depot = instance.origin
     max_dist = 0
 
     for tour in result['sol']:
@@ -172,10 +336,10 @@ def verify_objective(result, params):
         
         for item in tour:
             next_loc = item - 1
-            dist += distances.get((current, next_loc), 0)
+            dist += int(distances[current, next_loc])
             current = next_loc
         
-        dist += distances.get((current, depot), 0)
+        dist += int(distances[current, depot])
         max_dist = max(max_dist, dist)
 
     if abs(max_dist - result['obj']) > 0.5:
@@ -1,19 +1,49 @@
 from .mip_model import solve_mcp_mip
-from .mip_utils import parse_instance, write_output, combine_results, run_with_timeout
+from .mip_matrix import solve_mcp_mip_matrix
+from .mip_compact import solve_mcp_compact
+from .mip_utils import write_output, run_with_timeout
+from common.instance import Instance
+from common.results import best_result
+from common.results_db import record_result
+from common.heuristic import heuristic_result, fallback
+from common.bounds import strongest_bound
+from common.incumbent import read_incumbent
 import os
-import numpy as np
 
 INSTANCES_DIR = os.path.abspath('instances')
+MAX_TIME = 300
 
-def choose_solver(solver_name):
+def choose_solver(solver_name, in_memory=False):
+    # in_memory: gurobipy/highspy in this process instead of the solver binary and LP/MPS files
     match solver_name:
         case "gurobi":
-            return "GUROBI_CMD"
+            return "GUROBI" if in_memory else "GUROBI_CMD"
         case "highs":
-            return "HiGHS_CMD"
+            return "HiGHS" if in_memory else "HiGHS_CMD"
         case _:
             print("Invalid solver name. Please choose from Gurobi or HiGHS.")
 
+def choose_backend(backend, solver_name, in_memory=False, formulation='three_index', subtours='mtz'):
+    # pulp: PuLP expressions, matrix: NumPy arrays passed to highspy/gurobipy (always in memory)
+    # three_index: arcs per courier, compact: arcs shared by the couriers (PuLP only)
+    # subtours: mtz constraints in the model, or lazy cuts while solving (matrix only)
+    if formulation not in ("three_index", "compact"):
+        raise ValueError(f"Unsupported formulation: {formulation}, choose from three_index or compact")
+    if formulation == "compact" and backend != "pulp":
+        raise ValueError("The compact formulation is only available with the pulp backend")
+    if subtours not in ("mtz", "lazy"):
+        raise ValueError(f"Unsupported subtour elimination: {subtours}, choose from mtz or lazy")
+    if subtours == "lazy" and backend != "matrix":
+        raise ValueError("Lazy subtour elimination is only available with the matrix backend")
+    match backend:
+        case "pulp":
+            model_func = solve_mcp_compact if formulation == "compact" else solve_mcp_mip
+            return model_func, choose_solver(solver_name, in_memory)
+        case "matrix":
+            return solve_mcp_mip_matrix, solver_name
+        case _:
+            raise ValueError(f"Unsupported backend: {backend}, choose from pulp or matrix")
+
 def choose_instance(instance_name):
     if int(instance_name) in range(1, 10):
         instance = f"inst0{instance_name}.dat"
@@ -38,7 +68,54 @@ def prepare_solution(input):
 
     return output
 
-def execute_mip(instance_name: str, solver_name: str = 'highs', symbreak: bool = False):
+def warm_start_solution(instance, heuristic):
+    # best known tours: from any approach in res/, or the heuristic ones when they are better
+    obj, sol = best_result(instance)
+    if heuristic['obj'] is not None and (obj is None or heuristic['obj'] < obj):
+        return heuristic['sol']
+    return sol
+
+def cut_options(subtours, fractional_cuts):
+    # only the matrix backend knows about them, and only without MTZ
+    return {'subtours': subtours, 'fractional_cuts': fractional_cuts} if subtours == 'lazy' else {}
+
+def solve_instance(instance_name: str, solver_name: str = 'highs', symbreak: bool = False, threads: int = None,
+                   backend: str = 'pulp', in_memory: bool = False, warm_start: bool = False,
+                   formulation: str = 'three_index', subtours: str = 'mtz', fractional_cuts: bool = False,
+                   incumbent=None, time_limit: int = MAX_TIME):
+    # single instance, in the current process: the caller is in charge of the wall clock
+    # incumbent: objective shared by the portfolio pipelines, the upper bound when better than the heuristic
+    instance = Instance.from_file(INSTANCES_DIR + "/" + choose_instance(instance_name))
+    model_func, solver = choose_backend(backend, solver_name.lower(), in_memory, formulation, subtours)
+    lower_bound = strongest_bound(instance)
+    heuristic = heuristic_result(instance, lower_bound)
+    if heuristic['optimal']:
+        # the heuristic tours reach the lower bound: nothing left to prove
+        return heuristic
+    solution = model_func(
+        instance=instance,
+        solver=solver,
+        time_limit_sec=time_limit,
+        add_symmetry_break=symbreak,
+        threads=threads,
+        upper_bound=read_incumbent(incumbent, heuristic['obj']),
+        initial_solution=warm_start_solution(instance, heuristic) if warm_start else None,
+        lower_bound=lower_bound,
+        **cut_options(subtours, fractional_cuts)
+    )
+    return fallback(prepare_solution(solution), heuristic)
+
+def store_result(result, instance_name: str, solver_name: str, symbreak: bool):
+    # same files execute_mip writes
+    instance = '.'.join(choose_instance(instance_name).split('.')[:-1])
+    results_dir = "./MIP/result_symbreak" if symbreak else "./MIP/result_nosymbreak"
+    write_output(result, os.path.join(results_dir, solver_name, f"{instance}.json"), solver_name)
+    key = f"{solver_name}_symbreak" if symbreak else solver_name
+    record_result('MIP', instance, key, result, solver_name, symbreak)
+
+def execute_mip(instance_name: str, solver_name: str = 'highs', symbreak: bool = False, backend: str = 'pulp',
+                in_memory: bool = False, warm_start: bool = False, formulation: str = 'three_index',
+                subtours: str = 'mtz', fractional_cuts: bool = False):
     
     if instance_name == "all":
         print("Running on all instances...")
@@ -46,14 +123,23 @@ def execute_mip(instance_name: str, solver_name: str = 'highs', symbreak: bool =
             execute_mip(
                 solver_name=solver_name, 
                 symbreak=symbreak, 
-                instance_name=str(i + 1)
+                instance_name=str(i + 1),
+                backend=backend,
+                in_memory=in_memory,
+                warm_start=warm_start,
+                formulation=formulation,
+                subtours=subtours,
+                fractional_cuts=fractional_cuts
                 )
 
     else:
         print(f"Running on instance {instance_name}...")
-        solver = choose_solver(solver_name.lower())
+        model_func, solver = choose_backend(backend, solver_name.lower(), in_memory, formulation, subtours)
         instance = choose_instance(instance_name)
-        params = parse_instance(INSTANCES_DIR + "/" + instance)
+        mcp_instance = Instance.from_file(INSTANCES_DIR + "/" + instance)
+        # feasible solution in milliseconds: upper bound for the model, reported if the solver finds nothing
+        lower_bound = strongest_bound(mcp_instance)
+        heuristic = heuristic_result(mcp_instance, lower_bound)
 
         os.makedirs("./MIP/result_symbreak", exist_ok=True)
         os.makedirs("./MIP/result_nosymbreak", exist_ok=True)
@@ -63,21 +149,29 @@ def execute_mip(instance_name: str, solver_name: str = 'highs', symbreak: bool =
         else:
             results_dir = os.path.join("./MIP/result_nosymbreak", solver_name)
 
-        solution = run_with_timeout(
-            timeout=305,
-            model_func=solve_mcp_mip,
-            params=params,
-            solver=solver,
-            time_limit_sec=305,
-            add_symmetry_break=symbreak
-        )
+        if heuristic['optimal']:
+            # the heuristic tours reach the lower bound: nothing left to prove
+            result = heuristic
+        else:
+            solution = run_with_timeout(
+                timeout=305,
+                model_func=model_func,
+                instance=mcp_instance,
+                solver=solver,
+                time_limit_sec=305,
+                add_symmetry_break=symbreak,
+                upper_bound=heuristic['obj'],
+                # warm_start: the best known tours are the MIP start
+                initial_solution=warm_start_solution(mcp_instance, heuristic) if warm_start else None,
+                lower_bound=lower_bound,
+                **cut_options(subtours, fractional_cuts)
+            )
 
-        print(solution)
+            print(solution)
+            result = fallback(prepare_solution(solution), heuristic)
 
         output_path = os.path.join(results_dir, f"{'.'.join(instance.split('.')[:-1])}.json")
-        write_output(prepare_solution(solution), output_path, solver_name)
-    
-    combine_results(
-        no_symm_dir="./MIP/result_nosymbreak",
-        symm_dir="./MIP/result_symbreak"
-    )
+        write_output(result, output_path, solver_name)
+        # only res/MIP/<instance>.json is rewritten
+        key = f"{solver_name}_symbreak" if symbreak else solver_name
+        record_result('MIP', mcp_instance.name, key, result, solver_name, symbreak)
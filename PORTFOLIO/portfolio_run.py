@@ -0,0 +1,151 @@
+import os
+import time
+import queue
+import importlib
+import multiprocessing
+from common.workers import start_worker, stop_worker, available_cores
+from common.results_db import record_result
+from common.instance import Instance
+from common.bounds import strongest_bound
+from common.heuristic import heuristic_solution
+from common.incumbent import shared_incumbent, publish_incumbent
+
+MAX_TIME = 300
+
+# pipeline name -> (module exposing solve_instance, extra arguments)
+# every solve_instance takes the shared incumbent and a time_limit: CP and MIP bound the objective with
+# it on start, the binary search of SMT re-reads it before every probe, CP, SMT and ALNS publish their
+# improving solutions
+PIPELINES = {
+    'cp_gecode':  ('CP.cp_run',   {'solver_name': 'gecode'}),
+    'cp_chuffed': ('CP.cp_run',   {'solver_name': 'chuffed'}),
+    'mip_highs':  ('MIP.mip_run', {'solver_name': 'highs'}),
+    'mip_gurobi': ('MIP.mip_run', {'solver_name': 'gurobi'}),
+    'smt_z3':     ('SMT.smt_run', {'search': 'binary'}),
+    'heur_alns':  ('HEUR.heur_run', {'solver_name': 'alns'}),
+}
+
+def choose_instance(instance_name):
+    if int(instance_name) in range(1, 10):
+        instance = f"inst0{instance_name}"
+    elif int(instance_name) in range(10, 22):
+        instance = f"inst{instance_name}"
+    return instance
+
+def failed_solution():
+    return {
+        'time' : MAX_TIME,
+        'optimal' : False,
+        'obj' : -1,
+        'sol': []
+        }
+
+def has_solution(result):
+    return bool(result.get('sol'))
+
+def pipeline_budget(time_limit):
+    # seconds of the race kept from the pipelines: their final result reaches the portfolio in time
+    return max(time_limit - min(10, time_limit // 10), 1)
+
+def pipeline_worker(results, incumbent, name, instance_name, symbreak, deadline):
+    module_name, kwargs = PIPELINES[name]
+    try:
+        module = importlib.import_module(module_name)
+        # one core per pipeline, until the deadline whatever its imports took
+        result = module.solve_instance(instance_name=instance_name, symbreak=symbreak, threads=1,
+                                       incumbent=incumbent, time_limit=max(int(deadline - time.time()), 1),
+                                       **kwargs)
+    except Exception as e:
+        print(f"{name} failed: {e}")
+        result = failed_solution()
+
+    if has_solution(result):
+        publish_incumbent(incumbent, result['obj'])
+    results.put(('result', name, result))
+
+def run_portfolio(instance_name, symbreak=False, pipelines=None, time_limit=MAX_TIME):
+    """
+    Races the pipelines on one instance, each one in its own process (and core when
+    possible), from the heuristic tours. The pipelines stop a margin before time_limit
+    and send every improving solution on the way, the best one wins even if its pipeline
+    doesn't report in time. Returns the name of the winning pipeline and its result.
+    """
+    pipelines = list(PIPELINES) if pipelines is None else pipelines
+    unknown = set(pipelines) - set(PIPELINES)
+    if unknown:
+        raise ValueError(f"unknown pipelines {sorted(unknown)}, choose from {', '.join(PIPELINES)}")
+    start_time = time.time()
+    instance = Instance.from_file(os.path.abspath('instances') + '/' + choose_instance(instance_name) + '.dat')
+    lower = strongest_bound(instance)
+
+    results = multiprocessing.Queue()
+    # the pipelines start from the constructive heuristic, and tighten one another's bound
+    obj, sol = heuristic_solution(instance)
+    incumbent = shared_incumbent(obj, results)
+    winner, best = None, None
+    if obj is not None:
+        winner, best = 'heuristic', {'optimal': obj <= lower, 'obj': obj, 'sol': sol}
+    cores = available_cores()
+
+    workers = {}
+    if best is None or not best['optimal']:
+        deadline = start_time + pipeline_budget(time_limit)
+        for i, name in enumerate(pipelines):
+            workers[name] = start_worker(
+                pipeline_worker, results, incumbent.pipeline(name), name, instance_name, symbreak, deadline,
+                cores={cores[i % len(cores)]}
+            )
+
+    pending = set(workers)
+    while pending:
+        remaining = start_time + time_limit - time.time()
+        if remaining <= 0:
+            break
+        try:
+            kind, name, result = results.get(timeout=min(1, remaining))
+        except queue.Empty:
+            # a worker that died without reporting will never answer
+            if results.empty():
+                pending = {name for name in pending if workers[name].is_alive()}
+            continue
+        if kind == 'result':
+            pending.discard(name)
+
+        if not has_solution(result):
+            continue
+        if best is None or result['obj'] < best['obj'] or (result['optimal'] and result['obj'] == best['obj']):
+            winner, best = name, result
+        # an incumbent matching the lower bound is optimal as well
+        if best['optimal'] or best['obj'] <= lower:
+            best['optimal'] = True
+            break
+
+    for p in workers.values():
+        stop_worker(p)
+
+    if best is None:
+        return None, failed_solution()
+
+    elapsed = time.time() - start_time
+    output = dict(best)
+    output['time'] = int(elapsed) if elapsed < MAX_TIME else MAX_TIME
+    output['optimal'] = best['optimal'] and elapsed < MAX_TIME
+    output['solver'] = winner
+    return winner, output
+
+def execute_portfolio(instance_name: str, symbreak: bool = False, time_limit: int = MAX_TIME, pipelines=None):
+    # pipelines: names in PIPELINES, a list or comma separated (all of them by default)
+    if isinstance(pipelines, str):
+        pipelines = pipelines.split(',')
+    if instance_name == "all":
+        print("Running on all instances...")
+        for i in range(len(os.listdir(os.path.abspath('instances')))):
+            execute_portfolio(instance_name=str(i + 1), symbreak=symbreak, time_limit=time_limit, pipelines=pipelines)
+        return
+
+    print(f"Running portfolio on instance {instance_name}...")
+    winner, result = run_portfolio(instance_name, symbreak=symbreak, pipelines=pipelines, time_limit=time_limit)
+    print(f"winner: {winner}, obj: {result['obj']}, optimal: {result['optimal']}")
+
+    key = 'portfolio_symbreak' if symbreak else 'portfolio'
+    record_result('PORTFOLIO', choose_instance(instance_name), key, result, 'portfolio', symbreak)
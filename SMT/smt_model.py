@@ -1,5 +1,6 @@
 from z3 import *
 import time
+from common.preprocessing import prune_arcs
 
 def Iff(A, B):
     return And(
@@ -7,9 +8,139 @@ def Iff(A, B):
             Implies(B,A)
         )
     
-def my_model(m,n,l,s,d,lower,symm_break=False,timeout=None, opt_container=None):
+def lex_leq(opt, a, b, name, guard=True):
+    '''
+    guard -> a <=_lex b in linear size: eq_k (a and b equal on the first k positions) is a
+    chain of auxiliary Booleans, eq_0 = guard and eq_k -> a[k] <= b[k]
+    '''
+    eq = BoolVal(guard) if isinstance(guard, bool) else guard
+    for k in range(len(a)):
+        opt.add(Implies(eq, a[k] <= b[k]))
+        if k + 1 < len(a):
+            nxt = Bool(f"{name}_eq_{k + 1}")
+            opt.add(nxt == And(eq, a[k] == b[k]))
+            eq = nxt
+
+def add_symmetry_breaking(opt, orders, loads, capacities):
+    '''
+    orders[c]: item orders of courier c. Couriers with the same capacity can always swap
+    their routes, so their orders are chained in lexicographic order within the group (the
+    other pairs follow by transitivity); couriers with different capacities only when both
+    loads fit the smaller capacity.
+    '''
+    m = len(capacities)
+    groups = {}
+    for c in range(m):
+        groups.setdefault(capacities[c], []).append(c)
+    for group in groups.values():
+        for c1, c2 in zip(group[:-1], group[1:]):
+            lex_leq(opt, orders[c1], orders[c2], f"lex_{c1}_{c2}")
+    for c1 in range(m):
+        for c2 in range(c1 + 1, m):
+            if capacities[c1] != capacities[c2]:
+                capacity = min(capacities[c1], capacities[c2])
+                lex_leq(opt, orders[c1], orders[c2], f"lex_{c1}_{c2}",
+                        guard=And(loads[c1] <= capacity, loads[c2] <= capacity))
+
+def minimize(opt, max_dist, lower, upper, search, start_time, timeout=None, extract=None, on_solution=None,
+             shared=None):
+    '''
+    optimize: z3 Optimize in one check. binary/linear: probes max_dist <= bound on a plain
+    Solver, the bound passed as an assumption, so what the solver learns stays valid for the
+    next probe; each answer is then added for good (max_dist < found or max_dist > bound).
+    timeout: seconds from start_time for the whole search, not for each probe.
+    Every improving model goes through extract (z3 models only live inside the Optimize
+    callback) and on_solution. Returns the z3 result (sat once optimality is proved), the
+    best extracted solution and the (time, max_dist) of every improving model.
+    shared: the best max_dist known elsewhere (another portfolio pipeline) or None, read
+    before every binary/linear probe: the upper bound from then on, so that the search can
+    still prove it optimal.
+    '''
+    best, incumbents = None, []
+
+    def improve(model):
+        nonlocal best
+        found = extract(model)
+        if best is not None and found['max_distance'] >= best['max_distance']:
+            return
+        best = found
+        incumbents.append((time.time() - start_time, found['max_distance']))
+        if on_solution is not None:
+            on_solution(dict(found, time=incumbents[-1][0], solution_found=True, optimal=False))
+
+    if search == 'optimize':
+        # intermediate models as the objective improves
+        opt.set_on_model(improve)
+        opt.minimize(max_dist)
+        result = opt.check()
+        if result == sat:
+            improve(opt.model())
+        return result, best, incumbents
+
+    lo, hi = lower, upper
+    result = unknown
+    while hi is None or lo <= hi:
+        known = shared() if shared is not None else None
+        if known is not None and (hi is None or known < hi):
+            hi = known
+            opt.add(max_dist <= hi)
+            continue
+        if timeout:
+            remaining = start_time + timeout - time.time()
+            if remaining <= 0:
+                break
+            opt.set("timeout", int(remaining * 1000))
+        if hi is None:
+            # no upper bound: any solution first
+            bound, assumptions = None, []
+        else:
+            bound = hi if search == 'linear' else (lo + hi) // 2
+            probe = Bool(f"probe_{bound}")
+            opt.add(Implies(probe, max_dist <= bound))
+            assumptions = [probe]
+        answer = opt.check(*assumptions)
+        if answer == sat:
+            improve(opt.model())
+            hi = best['max_distance'] - 1
+            opt.add(max_dist <= hi)
+        elif answer == unsat:
+            if bound is None:
+                result = unsat
+                break
+            lo = bound + 1
+            opt.add(max_dist >= lo)
+        else:
+            # timeout
+            break
+    else:
+        # every bound below lo is refuted
+        if best is None:
+            result = opt.check()
+            if result == sat:
+                improve(opt.model())
+        else:
+            # optimal unless the bound came from a better solution found elsewhere and not matched here
+            result = sat if best['max_distance'] <= lo else unknown
+    return result, best, incumbents
+
+def my_model(instance,lower,symm_break=False,timeout=None, opt_container=None, threads=None, arcs=None, upper=None,
+             search='optimize', on_solution=None, shared=None):
     start_time = time.time()
-    opt = Optimize()
+    # plain python numbers for the z3 expressions
+    m, n = instance.m, instance.n
+    l = instance.capacities.tolist()
+    s = instance.sizes.tolist()
+    d = instance.distances.tolist()
+    # a[i][j][k] -> courier i may travel from j to k, the other travels terms are left out of the sums
+    if arcs is None:
+        arcs = prune_arcs(instance, upper)
+    a = arcs.allowed.tolist()
+    if threads:
+        # global z3 parameters: this is meant to run in its own process
+        set_param('parallel.enable', threads > 1)
+        set_param('parallel.threads.max', threads)
+    # search: optimize (z3 Optimize) or a binary/linear search on max_dist with a plain Solver (minimize)
+    opt = Optimize() if search == 'optimize' else Solver()
     if timeout:
         opt.set("timeout", timeout*1000) 
 
@@ -46,13 +177,13 @@ def my_model(m,n,l,s,d,lower,symm_break=False,timeout=None, opt_container=None):
         opt.add(
             Sum(
                 # the courier i start from n and end only in one j
-                [If(travels(i,n,j), 1, 0) for j in range(n)]
+                [If(travels(i,n,j), 1, 0) for j in range(n) if a[i][n][j]]
             ) == 1
         )
         opt.add(
             Sum(
                 # the courier i start from one j and end in n
-                [If(travels(i,j,n), 1, 0) for j in range(n)]
+                [If(travels(i,j,n), 1, 0) for j in range(n) if a[i][j][n]]
             ) == 1
         )
 
@@ -62,16 +193,19 @@ def my_model(m,n,l,s,d,lower,symm_break=False,timeout=None, opt_container=None):
             opt.add(
                 Sum(
                     # the number of times the courier i leaves from point j is once
-                    [If(travels(i,k,j), 1, 0) for k in range(n+1)]
+                    [If(travels(i,k,j), 1, 0) for k in range(n+1) if a[i][k][j]]
                 ) == If(item_order(i,j)>=1,1, 0)
             )
 
     for i in range(m):
-        for j in range(n):
-            # this combined with the fact that a courier can't come back in the same item/point is sufficient
-            opt.add(
-                    Not(travels(i, j,j))
-                )
+        for j in range(n+1):
+            for k in range(n+1):
+                if not a[i][j][k]:
+                    # self loops and pruned arcs: this combined with the fact that a courier can't come back
+                    # in the same item/point is sufficient
+                    opt.add(
+                            Not(travels(i, j, k))
+                        )
 
 
     # value constraints
@@ -90,10 +224,10 @@ def my_model(m,n,l,s,d,lower,symm_break=False,timeout=None, opt_container=None):
                     item_order(i, j) == 0,
                     And(
                         Sum(
-                            [If(travels(i,j,k), 1, 0) for k in range(n+1)]
+                            [If(travels(i,j,k), 1, 0) for k in range(n+1) if a[i][j][k]]
                         )==0, 
                         Sum(
-                            [If(travels(i,k,j), 1, 0) for k in range(n+1)]
+                            [If(travels(i,k,j), 1, 0) for k in range(n+1) if a[i][k][j]]
                         )==0
                     )
                 ),
@@ -116,16 +250,17 @@ def my_model(m,n,l,s,d,lower,symm_break=False,timeout=None, opt_container=None):
 
     for i in range(m):
         for k in range(n):
-            opt.add(
-                Implies(    # if the courier i goes from the origin elsewhere, then this is the first item to be delivered
-                    travels(i, n, k), item_order(i, k) == 1
+            if a[i][n][k]:
+                opt.add(
+                    Implies(    # if the courier i goes from the origin elsewhere, then this is the first item to be delivered
+                        travels(i, n, k), item_order(i, k) == 1
+                    )
                 )
-            )
 
     for i in range(m):
         for j in range(n):
             for k in range(n + 1):
-                if j != k:
+                if a[i][j][k]:
                     opt.add(
                         Implies(    # the order of the current item is past item + 1 
                             travels(i, j, k),
@@ -155,43 +290,14 @@ def my_model(m,n,l,s,d,lower,symm_break=False,timeout=None, opt_container=None):
         )
 
     if symm_break:
-        for c1 in range(m):
-            for c2 in range(c1 + 1, m):
-                # aggiungere if
-                opt.add(
-                    Implies(
-                        # if the work of c1 can be swapped with the work of c2
-                        If( # the max of the current load
-                            courier_load[c1]>=courier_load[c2], courier_load[c1], courier_load[c2]
-                        )<=
-                        If( # the minimum of the couriers capacity
-                            l[c1]<=l[c2], l[c1], l[c2]
-                        ),
-                        # then lexicographic order
-                        # logic:
-                        #  arr1 <=_lex arr2 IFF
-                        # (arr1[0] < arr2[0]) OR
-                        # ...
-                        # (arr1[0] == arr2[0] AND arr1[1] == arr2[1] AND arr1[2] < arr2[2])
-                        Or(
-                            [And(
-                                *[
-                                    [item_order(c1, j) for j in range(n)][k] == [item_order(c2, j) for j in range(n)][k] 
-                                    for k in range(i)
-                                ],
-                                [item_order(c1, j) for j in range(n)][i] <= [item_order(c2, j) for j in range(n)][i]
-                            )
-                            for i in range(len([item_order(c1, j) for j in range(n)]))]
-                        )
-                    )
-                )
+        add_symmetry_breaking(opt, [[item_order(c, j) for j in range(n)] for c in range(m)], courier_load, l)
 
     # cost
     distances = []
     for i in range(m):
         distances.append(
             Sum(
-                [If(travels(i, j, k), d[j][k], 0) for j in range(n+1) for k in range(n+1)]
+                [If(travels(i, j, k), d[j][k], 0) for j in range(n+1) for k in range(n+1) if a[i][j][k]]
             )
         )
 
@@ -209,46 +315,164 @@ def my_model(m,n,l,s,d,lower,symm_break=False,timeout=None, opt_container=None):
     opt.add(
         max_dist >= lower
     )
+    if upper is not None:
+        # a solution this good is already known (heuristic)
+        opt.add(
+            max_dist <= upper
+        )
 
-    opt.minimize(max_dist)
-    
     if opt_container is not None:
         opt_container[0] = None
 
-    result = opt.check()
-    solution = {
-            'time' : time.time() - start_time,
-            'solution_found' : True,
-            'status': str(result), 
+    def extract(model):
+        found = {
+            'max_distance': model.evaluate(max_dist).as_long(),
             'travels': [],
             'item_order': [],
             'distances': [],
-            'max_distance': 0
         }
-    
-    if result == sat:
-        model = opt.model()
-        solution['max_distance'] = model.evaluate(max_dist).as_long()
-
         for i in range(m):
             for j in range(n + 1):
                 for k in range(n + 1):
                     if is_true(model.evaluate(travels(i, j, k))):
-                        solution['travels'].append((i, j, k))
+                        found['travels'].append((i, j, k))
 
         for i in range(m):
             for j in range(n):
-                val = model.evaluate(item_order(i, j))
+                val = model.evaluate(item_order(i, j), model_completion=True)
                 if val is not None and val.as_long() >= 0:
-                    solution['item_order'].append((i, j, val.as_long()))
+                    found['item_order'].append((i, j, val.as_long()))
+
+        for i in range(m):
+            found['distances'].append(model.evaluate(distances[i]).as_long())
+        return found
+
+    build_time = time.time() - start_time
+    result, best, incumbents = minimize(opt, max_dist, lower, upper, search, start_time, timeout, extract, on_solution,
+                                        shared)
+    solution = {
+            'time' : time.time() - start_time,
+            'build_time': build_time,
+            'solution_found' : best is not None,
+            'optimal': result == sat,
+            'status': str(result), 
+            'incumbents': incumbents,
+            'travels': [],
+            'item_order': [],
+            'distances': [],
+            'max_distance': 0
+        }
+    if best is not None:
+        solution.update(best)
+    return solution
+
+def array_model(instance,lower,symm_break=False,timeout=None, opt_container=None, threads=None, arcs=None, upper=None,
+                search='optimize', on_solution=None, shared=None):
+    '''
+    Same model as my_model with explicit variables instead of uninterpreted functions:
+    travels[i][j][k] Bools only for the arcs left by the preprocessing, item_order[i][j] Ints
+    in 0..n for the items. The order increases along the arcs, so the depot in/out degrees
+    replace courier_last_item and the Distinct constraints.
+    '''
+    start_time = time.time()
+    m, n = instance.m, instance.n
+    l = instance.capacities.tolist()
+    s = instance.sizes.tolist()
+    d = instance.distances.tolist()
+    if arcs is None:
+        arcs = prune_arcs(instance, upper)
+    a = arcs.allowed.tolist()
+    if threads:
+        set_param('parallel.enable', threads > 1)
+        set_param('parallel.threads.max', threads)
+    opt = Optimize() if search == 'optimize' else Solver()
+    if timeout:
+        opt.set("timeout", timeout*1000)
+
+    # travels[i][(j, k)] -> courier i travels from j to k
+    travels = [{(j, k): Bool(f"travels_{i}_{j}_{k}") for j in range(n+1) for k in range(n+1) if a[i][j][k]}
+               for i in range(m)]
+    # delivers[i][j] -> courier i delivers item j, item_order[i][j] its position (0 if not delivered)
+    delivers = [[Bool(f"delivers_{i}_{j}") for j in range(n)] for i in range(m)]
+    item_order = [[Int(f"item_order_{i}_{j}") for j in range(n)] for i in range(m)]
+
+    def out_arcs(i, j):
+        return [travels[i][(j, k)] for k in range(n+1) if (j, k) in travels[i]]
+
+    def in_arcs(i, k):
+        return [travels[i][(j, k)] for j in range(n+1) if (j, k) in travels[i]]
+
+    for i in range(m):
+        # load constraint
+        opt.add(PbLe([(delivers[i][j], s[j]) for j in range(n)], l[i]))
+        # each courier path must start/end at the origin
+        opt.add(PbEq([(t, 1) for t in out_arcs(i, n)], 1))
+        opt.add(PbEq([(t, 1) for t in in_arcs(i, n)], 1))
+        for j in range(n):
+            # courier must deliver the item and leave
+            opt.add(Sum([If(t, 1, 0) for t in in_arcs(i, j)]) == If(delivers[i][j], 1, 0))
+            opt.add(Sum([If(t, 1, 0) for t in out_arcs(i, j)]) == If(delivers[i][j], 1, 0))
+            opt.add(If(delivers[i][j], And(item_order[i][j] >= 1, item_order[i][j] <= n), item_order[i][j] == 0))
+
+    # each item is assigned to only one courier
+    for j in range(n):
+        opt.add(PbEq([(delivers[i][j], 1) for i in range(m)], 1))
+
+    for i in range(m):
+        for (j, k), t in travels[i].items():
+            if j == n:
+                opt.add(Implies(t, item_order[i][k] == 1))
+            elif k != n:
+                # the order of the current item is past item + 1 (no subtours)
+                opt.add(Implies(t, item_order[i][k] == item_order[i][j] + 1))
 
+    courier_load = [Sum([If(delivers[i][j], s[j], 0) for j in range(n)]) for i in range(m)]
+    if symm_break:
+        add_symmetry_breaking(opt, item_order, courier_load, l)
+
+    # cost
+    distances = [Sum([If(t, d[j][k], 0) for (j, k), t in travels[i].items()]) for i in range(m)]
+    max_dist = Int("max_dist")
+    for distance in distances:
+        opt.add(max_dist >= distance)
+    opt.add(Or([max_dist == dist for dist in distances]))
+    opt.add(max_dist >= lower)
+    if upper is not None:
+        opt.add(max_dist <= upper)
+
+    if opt_container is not None:
+        opt_container[0] = None
+
+    def extract(model):
+        found = {'max_distance': model.evaluate(max_dist).as_long(), 'travels': [], 'item_order': [], 'distances': []}
         for i in range(m):
-            solution['distances'].append(model.evaluate(distances[i]).as_long())
-
-        return solution
-    elif result == unknown:
-        solution['solution_found'] = False
-        return solution
-    else: 
-        solution['solution_found'] = False
-        return solution
\ No newline at end of file
+            found['travels'].extend((i, j, k) for (j, k), t in travels[i].items() if is_true(model.evaluate(t)))
+            found['item_order'].extend((i, j, model.evaluate(item_order[i][j], model_completion=True).as_long())
+                                       for j in range(n))
+            found['distances'].append(model.evaluate(distances[i]).as_long())
+        return found
+
+    build_time = time.time() - start_time
+    result, best, incumbents = minimize(opt, max_dist, lower, upper, search, start_time, timeout, extract, on_solution,
+                                        shared)
+    solution = {
+            'time' : time.time() - start_time,
+            'build_time': build_time,
+            'solution_found' : best is not None,
+            'optimal': result == sat,
+            'status': str(result),
+            'incumbents': incumbents,
+            'travels': [],
+            'item_order': [],
+            'distances': [],
+            'max_distance': 0
+        }
+    if best is not None:
+        solution.update(best)
+    return solution
+
+# encoding name -> model function, same arguments and solution format
+ENCODINGS = {
+    'function': my_model,
+    'array': array_model,
+}
@@ -2,11 +2,68 @@ import os
 from tqdm import tqdm
 from .smt_utils import *
 from .smt_model import *
-import numpy as np
+from common.results_db import record_result
+from common.instance import Instance
+from common.bounds import strongest_bound
+from common.heuristic import heuristic_result, fallback
+from common.incumbent import read_incumbent, publish_incumbent
 
 MAX_TIME = 300
+SEARCH_MARGIN = 5     # the binary/linear search stops early enough to hand back its best model
 
-def execute_smt(symbreak: bool = False, instance_name: str = "all"):
+SEARCHES = ('optimize', 'binary', 'linear')
+
+def choose_encoding(encoding):
+    # function: z3 uninterpreted functions (original model), array: explicit Bool/Int variables
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported encoding: {encoding}, choose from {', '.join(ENCODINGS)}")
+    return ENCODINGS[encoding]
+
+def model_timeout(search, time_limit=MAX_TIME):
+    # z3 Optimize has nothing to hand back on timeout, the searches have their best model
+    return time_limit if search == 'optimize' else max(time_limit - SEARCH_MARGIN, 1)
+
+def solve_instance(instance_name: str, symbreak: bool = False, threads: int = None, encoding: str = 'function',
+                   search: str = 'optimize', incumbent=None, time_limit: int = MAX_TIME):
+    # single instance, in the current process: the caller is in charge of the wall clock
+    # incumbent: objective shared by the portfolio pipelines, read on start and before every
+    # binary/linear probe, every improving model is published to it
+    module_path = os.path.dirname(os.path.realpath(__file__))
+    instances_folder =  "/".join(module_path.split('/')[:-1]+['instances'])
+    path = instances_folder+'/'+choose_instance(instance_name)
+    instance = Instance.from_file(path)
+    lower = strongest_bound(instance)
+    heuristic = heuristic_result(instance, lower)
+    if heuristic['optimal']:
+        # the heuristic tours reach the lower bound: nothing left to prove
+        return heuristic
+    result_dict = choose_encoding(encoding)(
+        instance=instance,
+        lower = lower,
+        symm_break=symbreak,
+        timeout=model_timeout(search, time_limit),
+        threads=threads,
+        upper = read_incumbent(incumbent, heuristic['obj']),
+        search=search,
+        shared=lambda: read_incumbent(incumbent),
+        on_solution=lambda solution: publish_incumbent(incumbent, solution['max_distance'],
+                                                       prepare_solution(solution)['sol'])
+    )
+    return fallback(prepare_solution(result_dict), heuristic)
+
+def store_result(result, instance_name: str, symbreak: bool = False):
+    # same files execute_smt writes
+    filename = '.'.join(choose_instance(instance_name).split('.')[:-1])
+    if symbreak:
+        write_output(result, f'./SMT/result_symbreak/{filename}.json')
+    else:
+        write_output(result, f'./SMT/result_nosymbreak/{filename}.json')
+    record_result('SMT', filename, 'z3_symbreak' if symbreak else 'z3', result, 'z3', symbreak)
+
+def execute_smt(symbreak: bool = False, instance_name: str = "all", encoding: str = 'function', search: str = 'optimize'):
+    model_func = choose_encoding(encoding)
+    if search not in SEARCHES:
+        raise ValueError(f"Unsupported search: {search}, choose from {', '.join(SEARCHES)}")
     os.makedirs("./SMT/result_symbreak", exist_ok=True)
     os.makedirs("./SMT/result_nosymbreak", exist_ok=True)
 
@@ -23,28 +80,28 @@ def execute_smt(symbreak: bool = False, instance_name: str = "all"):
             for sb in [True, False]:
                 pbar.set_description(f"solving problem {name}")
                 path=instances_folder+f'/{name}'
-                filename,m,n,l,s,d = read_raw_instances(path)
-                result_dict = run_z3_with_external_timeout(
-                    external_timeout_seconds=MAX_TIME,
-                    model_func=my_model,
-                    m=m, 
-                    n=n, 
-                    l=l, 
-                    s=s, 
-                    d=d,
-                    lower = generate_lowerbound(d, n),
-                    symm_break=sb,
-                    timeout=MAX_TIME
-                )
-                if sb:
-                    write_output(prepare_solution(result_dict), f'./SMT/result_symbreak/{filename}.json')
+                instance = Instance.from_file(path)
+                filename = instance.name
+                lower = strongest_bound(instance)
+                heuristic = heuristic_result(instance, lower)
+                if heuristic['optimal']:
+                    # the heuristic tours reach the lower bound: nothing left to prove
+                    result = heuristic
                 else:
-                    write_output(prepare_solution(result_dict), f'./SMT/result_nosymbreak/{filename}.json')
-
-                combine_results(
-                    result_nosymbreak_dir="./SMT/result_nosymbreak",
-                    result_symbreak_dir="./SMT/result_symbreak"
-                )
+                    result_dict = run_z3_with_external_timeout(
+                        external_timeout_seconds=MAX_TIME,
+                        model_func=model_func,
+                        instance=instance,
+                        lower = lower,
+                        symm_break=sb,
+                        timeout=model_timeout(search),
+                        upper = heuristic['obj'],
+                        search=search
+                    )
+                    result = fallback(prepare_solution(result_dict), heuristic)
+                write_output(result, f"./SMT/{'result_symbreak' if sb else 'result_nosymbreak'}/{filename}.json")
+                # only res/SMT/<instance>.json is rewritten
+                record_result('SMT', filename, 'z3_symbreak' if sb else 'z3', result, 'z3', sb)
 
     else:
         instance_name = choose_instance(instance_name)
@@ -52,26 +109,24 @@ def execute_smt(symbreak: bool = False, instance_name: str = "all"):
         for name in pbar:
             pbar.set_description(f"solving problem {name}")
             path=instances_folder+f'/{name}'
-            filename,m,n,l,s,d = read_raw_instances(path)
-            result_dict = run_z3_with_external_timeout(
-                external_timeout_seconds=MAX_TIME,
-                model_func=my_model,
-                m=m, 
-                n=n, 
-                l=l, 
-                s=s, 
-                d=d,
-                lower = generate_lowerbound(d, n),
-                symm_break=symbreak,
-                timeout=MAX_TIME 
-            )
-        if symbreak:
-            write_output(prepare_solution(result_dict), f'./SMT/result_symbreak/{filename}.json')
-        else:
-            write_output(prepare_solution(result_dict), f'./SMT/result_nosymbreak/{filename}.json')
-
-    combine_results(
-        result_nosymbreak_dir="./SMT/result_nosymbreak",
-        result_symbreak_dir="./SMT/result_symbreak"
-    )
+            instance = Instance.from_file(path)
+            filename = instance.name
+            lower = strongest_bound(instance)
+            heuristic = heuristic_result(instance, lower)
+            if heuristic['optimal']:
+                result = heuristic
+            else:
+                result_dict = run_z3_with_external_timeout(
+                    external_timeout_seconds=MAX_TIME,
+                    model_func=model_func,
+                    instance=instance,
+                    lower = lower,
+                    symm_break=symbreak,
+                    timeout=model_timeout(search),
+                    upper = heuristic['obj'],
+                    search=search
+                )
+                result = fallback(prepare_solution(result_dict), heuristic)
+            write_output(result, f"./SMT/{'result_symbreak' if symbreak else 'result_nosymbreak'}/{filename}.json")
+            record_result('SMT', filename, 'z3_symbreak' if symbreak else 'z3', result, 'z3', symbreak)
     
@@ -8,52 +8,49 @@ import sys
 import multiprocessing
 from z3 import Z3Exception
 
-def read_raw_instances(path:str):
-    filename = "".join(path.split('/')[-1].split('.')[:-1])
-    with open(path, 'r') as f:
-        matrix = ''
-        for i, line in enumerate(f):
-            if i == 0:
-                m = int(line)
-            elif i == 1:
-                n = int(line)
-            elif i == 2:
-                l = [int(x) for x in line.split() if x.strip()]   # load
-            elif i == 3:
-                s = [int(x) for x in line.split() if x.strip()]   # item size
-            else:
-                matrix += line[:-1] + '; '
-    d = np.matrix(matrix[:-2]).tolist()
-    return filename,m,n,l,s,d
-
-def generate_lowerbound(d, n):
-    distances = []
-    for i in range(n):
-        distances.append(d[i][n] + d[n][i])
-    return max(distances)
-
 def model_wrapper(queue, model_func, *args, **kwargs):
+    # every improving solution is sent to the parent as soon as z3 finds it, the final one at the end
+    kwargs['on_solution'] = lambda solution: queue.put(('incumbent', solution))
     try:
         result = model_func(*args, **kwargs)
-        queue.put(result)
+        queue.put(('result', result))
     except Exception as e:
-        queue.put({'solution_found': False, 'status': 'error', 'error': str(e)})
+        queue.put(('result', {'solution_found': False, 'status': 'error', 'error': str(e)}))
 
 def run_z3_with_external_timeout(external_timeout_seconds, model_func, *args, **kwargs):
-    queue = multiprocessing.Queue()
-    p = multiprocessing.Process(target=model_wrapper, args=(queue, model_func, *args), kwargs=kwargs)
+    results = multiprocessing.Queue()
+    p = multiprocessing.Process(target=model_wrapper, args=(results, model_func, *args), kwargs=kwargs)
     p.start()
-    p.join(external_timeout_seconds)
+    deadline = time.time() + external_timeout_seconds
+
+    # the queue is read while the worker runs (a full pipe would block it)
+    best, result = None, None
+    while result is None:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            break
+        try:
+            kind, solution = results.get(timeout=min(remaining, 1))
+        except queue.Empty:
+            if not p.is_alive() and results.empty():
+                result = {'solution_found': False, 'status': 'no_result'}
+            continue
+        if kind == 'result':
+            result = solution
+        elif best is None or solution['max_distance'] < best['max_distance']:
+            best = solution
 
     if p.is_alive():
         p.terminate()
-        p.join()
-        return {'solution_found': False, 'status': 'timeout'}
-
-    if not queue.empty():
-        return queue.get()
-    else:
-        return {'solution_found': False, 'status': 'no_result'}
+    p.join()
+
+    if result is None:
+        result = {'solution_found': False, 'status': 'timeout'}
+    if not result['solution_found'] and best is not None:
+        # killed (or stopped by the z3 timeout) after some solution: the best one, not optimal
+        print(f"Timeout, best incumbent max_dist {best['max_distance']}")
+        result = dict(best, time=external_timeout_seconds, optimal=False, status=result['status'])
+    return result
     
 def oldrun_z3_with_external_timeout(external_timeout_seconds, model_func, *args, **kwargs):
     result_queue = queue.Queue()
@@ -159,39 +156,6 @@ def write_output(results, output_path):
     except Exception as e:
         print(f"Error writing output file {output_path}: {e}", file=sys.stderr)
 
-def combine_results(result_nosymbreak_dir, result_symbreak_dir):
-    
-    combined_results = {}
-    
-    for results_file in sorted(os.listdir(result_nosymbreak_dir)):
-        if results_file.startswith('.'):
-            continue
-        if results_file not in combined_results.keys():
-            combined_results[results_file] = {}
-        
-        updated_results = {}
-        results = json.load(open(os.path.join(result_nosymbreak_dir, results_file)))
-        updated_results = {'z3': results['z3']}
-        combined_results[results_file].update(updated_results)
-    
-    for results_file in sorted(os.listdir(result_symbreak_dir)):
-        if results_file.startswith('.'):
-            continue
-        if results_file not in combined_results.keys():
-            combined_results[results_file] = {}
-        
-        updated_results = {}
-        results = json.load(open(os.path.join(result_symbreak_dir, results_file)))
-        updated_results = {'z3_symbreak': results['z3']}
-        combined_results[results_file].update(updated_results)
-    
-    os.makedirs("res/SMT", exist_ok=True)
-
-    for file_name, result in combined_results.items():
-        output_path = os.path.join("res/SMT", file_name)
-        with open(output_path, 'w') as f:
-            json.dump(result, f, indent=4)
-
 def choose_instance(instance_name):
     if int(instance_name) in range(1, 10):
         instance = f"inst0{instance_name}.dat"
@@ -216,7 +180,8 @@ def prepare_solution(input):
 
         output = {
             'time' : int(input['time']) if  input['time']<=300 else 300,
-            'optimal' : input['solution_found'] if  input['time']<300 else False, 
+            # a search stopped by the timeout returns its best model, not optimal
+            'optimal' : input.get('optimal', True) if  input['time']<300 else False, 
             'obj' : input['max_distance'],
             'sol': percorso
             }
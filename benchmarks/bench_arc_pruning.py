@@ -0,0 +1,39 @@
+"""
+What the arc preprocessing removes on every instance: arcs, MIP y variables, MTZ rows
+and nonzeros, SMT travels terms and CP edges, with capacities only and with the best
+objective stored in res/ as upper bound.
+
+    python benchmarks/bench_arc_pruning.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.instance import Instance
+from common.preprocessing import prune_arcs, pruning_stats
+from common.results import best_result
+
+COLUMNS = ('arcs', 'arcs_removed', 'mip_vars_removed', 'mip_mtz_removed', 'mip_nonzeros_removed',
+           'smt_terms_removed', 'cp_edges_removed')
+
+def report(name, bound, stats, elapsed):
+    removed = 100 * stats['arcs_removed'] / stats['arcs']
+    print(f"{name:8} {str(bound):>6} {elapsed * 1000:8.1f} {removed:7.1f}% "
+          + " ".join(f"{stats[c]:>10}" for c in COLUMNS))
+
+def main():
+    instances_dir = os.path.join(ROOT, 'instances')
+    print(f"{'instance':8} {'UB':>6} {'ms':>8} {'pruned':>8} " + " ".join(f"{c[:10]:>10}" for c in COLUMNS))
+    for name in sorted(os.listdir(instances_dir)):
+        instance = Instance.from_file(os.path.join(instances_dir, name))
+        upper_bound, _ = best_result(instance, os.path.join(ROOT, 'res'))
+        for bound in (None, upper_bound) if upper_bound is not None else (None,):
+            start = time.perf_counter()
+            arcs = prune_arcs(instance, bound)
+            elapsed = time.perf_counter() - start
+            report(instance.name, bound, pruning_stats(instance, arcs), elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Strength and compute time of every lower bound in common/bounds.py, against the best
+known objective (any result in res/ or the constructive heuristic).
+
+    python benchmarks/bench_bounds.py
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.instance import Instance
+from common.bounds import BOUNDS
+from common.results import best_result
+from common.heuristic import heuristic_solution
+
+def main():
+    instances_dir = os.path.join(ROOT, 'instances')
+    print(f"{'instance':8} " + " ".join(f"{name:>18}" for name in BOUNDS) + f" {'best':>6} {'known':>6} {'gap':>7}")
+    for name in sorted(os.listdir(instances_dir)):
+        instance = Instance.from_file(os.path.join(instances_dir, name))
+        values = []
+        cells = []
+        for bound in BOUNDS.values():
+            start = time.perf_counter()
+            value = bound(instance)
+            elapsed = time.perf_counter() - start
+            values.append(value)
+            cells.append(f"{str(value):>7} {elapsed * 1000:8.1f}ms")
+        lower = max(value for value in values if value is not None)
+        known = [obj for obj in (best_result(instance, os.path.join(ROOT, 'res'))[0], heuristic_solution(instance)[0])
+                 if obj is not None]
+        upper = min(known) if known else None
+        gap = f"{100 * (upper - lower) / upper:6.1f}%" if upper else f"{'-':>7}"
+        print(f"{instance.name:8} " + " ".join(cells) + f" {lower:>6} {str(upper):>6} {gap}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+CP models: bounded_dpath over the edge list (cp.mzn) against successor variables with
+subcircuit (cp_succ.mzn), with and without symmetry breaking. Reports the flattened size
+(FlatZinc variables and constraints, flattening time), the propagation speed (search
+nodes and propagations per second) and the objective and solve time. Every measurement
+runs in a fresh interpreter; the FlatZinc cache is not used.
+
+    python benchmarks/bench_cp_models.py [gecode|chuffed] [time limit] [instance numbers...]
+"""
+import os
+import sys
+from child import ROOT, run_child
+
+MODELS = ['path', 'succ']
+
+CHILD = '''
+import sys, os, json, datetime
+from minizinc import Instance, Model, Solver, Status
+from CP.cp import MODELS
+from CP.utils import convert_instance
+from CP.profiles import solver_options, search_parameters
+
+solver, model, symbreak, path, time_limit = sys.argv[1], sys.argv[2], sys.argv[3] == "True", sys.argv[4], int(sys.argv[5])
+dzn, _ = convert_instance(path, os.path.join("CP", "instances") + "/")
+mzn = Model(os.path.join("CP", MODELS[model][int(symbreak)]))
+mzn.add_file(dzn, parse_data=True)
+for key, value in search_parameters(solver_options(solver)).items():
+    mzn[key] = value
+instance = Instance(Solver.lookup(solver), mzn)
+with instance.flat() as (fzn, ozn, stats):
+    size = {"vars": stats.get("flatIntVars", 0) + stats.get("flatBoolVars", 0),
+            "cons": stats.get("flatIntConstraints", 0) + stats.get("flatBoolConstraints", 0),
+            "flat": stats.get("flatTime", 0)}
+result = instance.solve(timeout=datetime.timedelta(seconds=time_limit))
+stats = result.statistics
+solve_time = stats.get("solveTime", datetime.timedelta(0))
+solve_time = solve_time.total_seconds() if isinstance(solve_time, datetime.timedelta) else float(solve_time)
+print(json.dumps(dict(size,
+                      obj=result["max_distance"] if result.solution is not None else None,
+                      optimal=result.status == Status.OPTIMAL_SOLUTION,
+                      time=solve_time,
+                      nodes=stats.get("nodes", 0) / max(solve_time, 1e-3),
+                      props=stats.get("propagations", 0) / max(solve_time, 1e-3))))
+'''
+
+def measure(solver, model, symbreak, path, time_limit):
+    return run_child(CHILD, solver, model, symbreak, path, time_limit, timeout=2 * time_limit + 300)
+
+def show(result):
+    if result is None:
+        return f"{'-':>9}{'-':>9}{'-':>7}{'-':>10}{'-':>10}{'-':>8}{'-':>7}"
+    obj = f"{result['obj']}{'*' if result['optimal'] else ''}" if result['obj'] is not None else '-'
+    return (f"{result['vars']:>9}{result['cons']:>9}{result['flat']:>7.1f}{result['nodes']:>10.0f}"
+            f"{result['props']:>10.0f}{obj:>8}{result['time']:>7.1f}")
+
+if __name__ == '__main__':
+    solver = sys.argv[1] if len(sys.argv) > 1 else 'gecode'
+    time_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    numbers = sys.argv[3:] or [str(i) for i in range(1, 22)]
+    configs = [(model, symbreak) for symbreak in (False, True) for model in MODELS]
+    columns = f"{'vars':>9}{'cons':>9}{'flat':>7}{'nodes/s':>10}{'props/s':>10}{'obj':>8}{'time':>7}"
+    print(f"{'':<10}" + "".join(f"{model + (' sb' if symbreak else ''):^{len(columns)}}" for model, symbreak in configs))
+    print(f"{'instance':<10}" + columns * len(configs))
+    for number in numbers:
+        name = f"inst{int(number):02d}"
+        path = os.path.join(ROOT, 'instances', name + '.dat')
+        print(f"{name:<10}" + "".join(show(measure(solver, model, symbreak, path, time_limit))
+                                      for model, symbreak in configs), flush=True)
+    print("(* optimal; flattening and solve times in seconds)")
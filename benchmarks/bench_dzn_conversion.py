@@ -0,0 +1,95 @@
+"""
+CP edge list generation and .dzn writing on every instance: NumPy masking and the bulk
+array writer of CP_file_instance against the networkx graph and json writer they
+replaced (copied below as they were; skipped if networkx isn't installed). Bounds and
+heuristic are left out, the arcs come from prune_arcs with the best objective in res/.
+
+    python benchmarks/bench_dzn_conversion.py [repeats]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import numpy as np
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.instance import Instance
+from common.preprocessing import prune_arcs
+from common.results import best_result
+from CP.CP_file_instance import CP_file_instance, array_literal
+
+def networkx_edges(d, arcs):
+    # previous CP_file_instance.generate_graph
+    import networkx as nx
+    tmp_d = np.vstack([d, d[-1,:]])
+    tmp_d = np.hstack([tmp_d, tmp_d[:, -1].reshape(-1, 1)])
+    start = tmp_d.shape[0]-2
+    allowed = arcs.arcs
+    allowed = np.hstack([allowed, allowed[:, -1:]])
+    G = nx.from_numpy_array(tmp_d, create_using=nx.DiGraph)
+    to_be_removed = [(u, v)
+                     for u, v in G.edges
+                     if     u==start+1
+                        or  v==start
+                        or  u==v
+                        or  not allowed[u, v]]
+    G.remove_edges_from(to_be_removed)
+    edges_array = np.array(G.edges).T
+    return edges_array[0]+1, edges_array[1]+1, [G[u][v]['weight'] for u, v in G.edges]
+
+def numpy_edges(d, arcs):
+    graph = SimpleNamespace(d=d, arcs=arcs)
+    CP_file_instance.generate_graph(graph)
+    return graph.e_from, graph.e_to, graph.weights
+
+def json_write(path, e_from, e_to, weights):
+    with open(path, 'w') as f:
+        f.write('FROM = %s;\n' % json.dumps(e_from.tolist()))
+        f.write('TO = %s;\n' % json.dumps(e_to.tolist()))
+        f.write('W = %s;\n' % json.dumps(weights))
+
+def bulk_write(path, e_from, e_to, weights):
+    with open(path, 'w') as f:
+        f.write('FROM = %s;\n' % array_literal(e_from))
+        f.write('TO = %s;\n' % array_literal(e_to))
+        f.write('W = %s;\n' % array_literal(weights))
+
+def measure(function, repeats, *args):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    try:
+        import networkx
+        old = True
+    except ImportError:
+        old = False
+    folder = os.path.join(ROOT, 'instances')
+    columns = ['edges'] + (['networkx', 'json write'] if old else []) + ['numpy', 'bulk write']
+    print(f"{'instance':<10}{'n':>5}" + ''.join(f"{c + (' [ms]' if c != 'edges' else ''):>18}" for c in columns))
+    totals = {c: 0 for c in columns[1:]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'instance.dzn')
+        for name in sorted(os.listdir(folder)):
+            instance = Instance.from_file(os.path.join(folder, name))
+            upper_bound, _ = best_result(instance, os.path.join(ROOT, 'res'))
+            arcs = prune_arcs(instance, upper_bound)
+            times = {}
+            times['numpy'], edges = measure(numpy_edges, repeats, instance.distances, arcs)
+            times['bulk write'], _ = measure(bulk_write, repeats, path, *edges)
+            if old:
+                times['networkx'], old_edges = measure(networkx_edges, repeats, instance.distances, arcs)
+                times['json write'], _ = measure(json_write, repeats, path, *old_edges)
+            for c in totals:
+                totals[c] += times[c]
+            print(f"{instance.name:<10}{instance.n:>5}{len(edges[0]):>18}"
+                  + ''.join(f"{times[c] * 1000:>18.2f}" for c in columns[1:]), flush=True)
+    print(f"{'total':<15}{'':>18}" + ''.join(f"{totals[c] * 1000:>18.2f}" for c in columns[1:]))
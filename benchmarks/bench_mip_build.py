@@ -0,0 +1,58 @@
+"""
+Model construction of the MIP formulation: PuLP expressions (build_mcp_model) against
+the NumPy/CSR arrays of the matrix backend, including the hand-over to HiGHS.
+Every measurement runs in a fresh interpreter; memory is the peak RSS above the
+interpreter with the modules already imported.
+
+    python benchmarks/bench_mip_build.py [instance numbers...]
+"""
+import os
+import sys
+from child import ROOT, run_child
+
+TIMEOUT = 600
+
+CHILD = '''
+import sys, time, json, resource
+from common.instance import Instance
+from common.bounds import round_trip_bound
+from MIP.mip_model import build_mcp_model
+from MIP.mip_matrix import build_mcp_arrays, highs_model
+
+instance = Instance.from_file(sys.argv[2])
+lower = round_trip_bound(instance)
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if sys.argv[1] == "pulp":
+    prob, _ = build_mcp_model(instance, False, lower)
+    size = (len(prob.variables()), len(prob.constraints))
+else:
+    model = build_mcp_arrays(instance, False, lower)
+    h = highs_model(model)
+    size = (model.num_col, model.num_row)
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - base
+print(json.dumps({"time": elapsed, "peak_mb": peak / 1024, "vars": size[0], "cons": size[1]}))
+'''
+
+def measure(backend, path):
+    return run_child(CHILD, backend, path, timeout=TIMEOUT)
+
+def show(result):
+    # the child timed out (> TIMEOUT s) or failed
+    if result is None:
+        return f"{'-':>12}{'-':>10}"
+    return f"{result['time']:>12.2f}{result['peak_mb']:>10.0f}"
+
+if __name__ == '__main__':
+    numbers = sys.argv[1:] or [str(i) for i in range(1, 22)]
+    print(f"{'instance':<10}{'vars':>10}{'cons':>10}{'pulp [s]':>12}{'[MB]':>10}{'matrix [s]':>12}{'[MB]':>10}")
+    for number in numbers:
+        name = f"inst{int(number):02d}"
+        path = os.path.join(ROOT, 'instances', name + '.dat')
+        matrix = measure('matrix', path)
+        pulp = measure('pulp', path)
+        size = matrix or pulp
+        n_vars, n_cons = (size['vars'], size['cons']) if size is not None else ('-', '-')
+        print(f"{name:<10}{n_vars:>10}{n_cons:>10}{show(pulp)}{show(matrix)}", flush=True)
+    print("(- failed or timed out)")
@@ -0,0 +1,65 @@
+"""
+Three-index MIP formulation (build_mcp_model, arcs per courier) against the two-index
+compact one (build_compact_model, arcs shared by the couriers): model size, PuLP build
+time and, with a time limit, the objective and solve time with in-memory HiGHS.
+Every measurement runs in a fresh interpreter, with the heuristic upper bound and the
+strongest lower bound both models get from mip_run.
+
+    python benchmarks/bench_mip_formulations.py [time limit] [instance numbers...]
+
+A time limit of 0 only builds the models.
+"""
+import os
+import sys
+from child import ROOT, run_child
+
+
+CHILD = '''
+import sys, time, json
+from common.instance import Instance
+from common.bounds import strongest_bound
+from common.heuristic import heuristic_solution
+from MIP.mip_model import build_mcp_model, solve_mcp_mip
+from MIP.mip_compact import build_compact_model, solve_mcp_compact
+
+formulation, path, time_limit = sys.argv[1], sys.argv[2], int(sys.argv[3])
+instance = Instance.from_file(path)
+lower = strongest_bound(instance)
+upper, _ = heuristic_solution(instance)
+build, solve = {"three_index": (build_mcp_model, solve_mcp_mip),
+                "compact": (build_compact_model, solve_mcp_compact)}[formulation]
+start = time.perf_counter()
+prob, _ = build(instance, False, lower, upper_bound=upper)
+result = {"build": time.perf_counter() - start, "vars": len(prob.variables()), "cons": len(prob.constraints)}
+if time_limit:
+    start = time.perf_counter()
+    solution = solve(instance, time_limit, False, "HiGHS", threads=1, upper_bound=upper, lower_bound=lower)
+    result.update(solve=time.perf_counter() - start, obj=solution["obj"], optimal=solution["optimal"])
+print(json.dumps(result))
+'''
+
+def measure(formulation, path, time_limit):
+    return run_child(CHILD, formulation, path, time_limit, timeout=2 * time_limit + 300)
+
+def show(result, time_limit):
+    if result is None:
+        return f"{'-':>10}{'-':>10}{'-':>9}" + (f"{'-':>9}{'-':>9}" if time_limit else "")
+    line = f"{result['vars']:>10}{result['cons']:>10}{result['build']:>9.2f}"
+    if time_limit:
+        obj = f"{result['obj']}{'*' if result['optimal'] else ''}"
+        line += f"{obj:>9}{result['solve']:>9.1f}"
+    return line
+
+if __name__ == '__main__':
+    time_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    numbers = sys.argv[2:] or [str(i) for i in range(1, 22)]
+    columns = f"{'vars':>10}{'cons':>10}{'build':>9}" + (f"{'obj':>9}{'solve':>9}" if time_limit else "")
+    print(f"{'':<10}{'three-index':^{len(columns)}}{'compact':^{len(columns)}}")
+    print(f"{'instance':<10}{columns}{columns}")
+    for number in numbers:
+        name = f"inst{int(number):02d}"
+        path = os.path.join(ROOT, 'instances', name + '.dat')
+        three_index = measure('three_index', path, time_limit)
+        compact = measure('compact', path, time_limit)
+        print(f"{name:<10}{show(three_index, time_limit)}{show(compact, time_limit)}", flush=True)
+    print("(* optimal; times in seconds)")
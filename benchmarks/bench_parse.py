@@ -0,0 +1,93 @@
+"""
+Parsing time of every instance with the shared Instance reader against the three
+readers it replaced (copied below as they were).
+
+    python benchmarks/bench_parse.py [repeats]
+"""
+import os
+import sys
+import time
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from common.instance import Instance
+
+def mip_parse_instance(filepath):
+    # previous MIP.mip_utils.parse_instance
+    with open(filepath, 'r') as f:
+        lines = [line.strip() for line in f if line.strip()]
+
+    m = int(lines[0])
+    n = int(lines[1])
+    capacities = list(map(int, lines[2].split()))
+    sizes = list(map(int, lines[3].split()))
+
+    distances = []
+    for i in range(4, 4 + n + 1):
+        distances.extend(map(int, lines[i].split()))
+
+    dist_matrix = {}
+    idx = 0
+    for r in range(n + 1):
+        for c in range(n + 1):
+            dist_matrix[(r, c)] = distances[idx]
+            idx += 1
+
+    return {
+        'm': m,
+        'n': n,
+        'capacities': {i: capacities[i] for i in range(m)},
+        'sizes': {j: sizes[j] for j in range(n)},
+        'distances': dist_matrix,
+        'origin_idx': n
+    }
+
+def read_raw_instances(path):
+    # previous SMT.smt_utils.read_raw_instances and CP.utils.read_raw_instances (before the graph)
+    filename = "".join(path.split('/')[-1].split('.')[:-1])
+    with open(path, 'r') as f:
+        matrix = ''
+        for i, line in enumerate(f):
+            if i == 0:
+                m = int(line)
+            elif i == 1:
+                n = int(line)
+            elif i == 2:
+                l = [int(x) for x in line.split() if x.strip()]
+            elif i == 3:
+                s = [int(x) for x in line.split() if x.strip()]
+            else:
+                matrix += line[:-1] + '; '
+    d = np.matrix(matrix[:-2]).tolist()
+    return filename,m,n,l,s,d
+
+READERS = {
+    'Instance':     Instance.from_file,
+    'MIP dict':     mip_parse_instance,
+    'SMT/CP matrix': read_raw_instances,
+}
+
+def measure(reader, path, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        reader(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    folder = os.path.join(ROOT, 'instances')
+    print(f"{'instance':<10}{'n':>5}" + ''.join(f"{name + ' [ms]':>20}" for name in READERS))
+    totals = {name: 0 for name in READERS}
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        n = Instance.from_file(path).n
+        row = f"{name.split('.')[0]:<10}{n:>5}"
+        for reader_name, reader in READERS.items():
+            t = measure(reader, path, repeats)
+            totals[reader_name] += t
+            row += f"{t * 1000:>20.2f}"
+        print(row)
+    print(f"{'total':<15}" + ''.join(f"{totals[name] * 1000:>20.2f}" for name in READERS))
@@ -0,0 +1,48 @@
+"""
+SMT encodings: z3 uninterpreted functions (my_model) against explicit Bool/Int variable
+arrays (array_model), with and without symmetry breaking. Reports the objective and the
+solve time; every run is in a fresh interpreter with the strongest lower bound and no
+upper bound, so z3 does the whole search.
+
+    python benchmarks/bench_smt_encodings.py [time limit] [instance numbers...]
+"""
+import os
+import sys
+from child import ROOT, run_child
+
+ENCODINGS = ['function', 'array']
+
+CHILD = '''
+import sys, json
+from common.instance import Instance
+from common.bounds import strongest_bound
+from SMT.smt_model import ENCODINGS
+
+encoding, path, symbreak, time_limit = sys.argv[1], sys.argv[2], sys.argv[3] == "True", int(sys.argv[4])
+instance = Instance.from_file(path)
+result = ENCODINGS[encoding](instance, strongest_bound(instance), symbreak, timeout=time_limit)
+print(json.dumps({"obj": result["max_distance"] if result["solution_found"] else None,
+                  "optimal": result["status"] == "sat" and result["time"] < time_limit, "time": result["time"]}))
+'''
+
+def measure(encoding, path, symbreak, time_limit):
+    return run_child(CHILD, encoding, path, symbreak, time_limit, timeout=time_limit + 120)
+
+def show(result):
+    if result is None or result['obj'] is None:
+        return f"{'-':>8}{'-':>8}"
+    obj = f"{result['obj']}{'*' if result['optimal'] else ''}"
+    return f"{obj:>8}{result['time']:>8.1f}"
+
+if __name__ == '__main__':
+    time_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    numbers = sys.argv[2:] or [str(i) for i in range(1, 11)]
+    configs = [(encoding, symbreak) for symbreak in (False, True) for encoding in ENCODINGS]
+    print(f"{'':<10}" + "".join(f"{encoding + (' sb' if symbreak else ''):>16}" for encoding, symbreak in configs))
+    print(f"{'instance':<10}" + f"{'obj':>8}{'time':>8}" * len(configs))
+    for number in numbers:
+        name = f"inst{int(number):02d}"
+        path = os.path.join(ROOT, 'instances', name + '.dat')
+        print(f"{name:<10}" + "".join(show(measure(encoding, path, symbreak, time_limit))
+                                      for encoding, symbreak in configs), flush=True)
+    print("(* optimal; times in seconds)")
@@ -0,0 +1,50 @@
+"""
+Cost of the SMT symmetry breaking constraints: model construction time (Python side,
+until z3 starts searching) and z3 solve time, with and without symmetry breaking, for
+both encodings. Every run is in a fresh interpreter with the strongest lower bound and
+the heuristic upper bound.
+
+    python benchmarks/bench_smt_symmetry.py [time limit] [instance numbers...]
+"""
+import os
+import sys
+from child import ROOT, run_child
+
+ENCODINGS = ['function', 'array']
+
+CHILD = '''
+import sys, json
+from common.instance import Instance
+from common.bounds import strongest_bound
+from common.heuristic import heuristic_solution
+from SMT.smt_model import ENCODINGS
+
+encoding, path, symbreak, time_limit = sys.argv[1], sys.argv[2], sys.argv[3] == "True", int(sys.argv[4])
+instance = Instance.from_file(path)
+upper, _ = heuristic_solution(instance)
+result = ENCODINGS[encoding](instance, strongest_bound(instance), symbreak, timeout=time_limit, upper=upper)
+print(json.dumps({"build": result["build_time"], "solve": result["time"] - result["build_time"],
+                  "obj": result["max_distance"] if result["solution_found"] else None, "optimal": result["optimal"]}))
+'''
+
+def measure(encoding, path, symbreak, time_limit):
+    return run_child(CHILD, encoding, path, symbreak, time_limit, timeout=10 * time_limit + 600)
+
+def show(result):
+    if result is None:
+        return f"{'-':>8}{'-':>8}{'-':>8}"
+    obj = f"{result['obj']}{'*' if result['optimal'] else ''}" if result['obj'] is not None else '-'
+    return f"{result['build']:>8.2f}{result['solve']:>8.1f}{obj:>8}"
+
+if __name__ == '__main__':
+    time_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 60
+    numbers = sys.argv[2:] or [str(i) for i in range(1, 22)]
+    configs = [(encoding, symbreak) for encoding in ENCODINGS for symbreak in (False, True)]
+    print(f"{'':<10}" + "".join(f"{encoding + (' sb' if symbreak else ''):>24}" for encoding, symbreak in configs))
+    print(f"{'instance':<10}" + f"{'build':>8}{'solve':>8}{'obj':>8}" * len(configs))
+    for number in numbers:
+        name = f"inst{int(number):02d}"
+        path = os.path.join(ROOT, 'instances', name + '.dat')
+        print(f"{name:<10}" + "".join(show(measure(encoding, path, symbreak, time_limit))
+                                      for encoding, symbreak in configs), flush=True)
+    print("(* optimal; times in seconds)")
@@ -0,0 +1,41 @@
+"""
+Startup cost of the command line: time to import main.py (the approach registry)
+and the solver stack of each approach, every sample in a fresh interpreter.
+
+    python benchmarks/bench_startup.py [repeats]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'interpreter':  'pass',
+    'main.py':      'import main',
+    'cp':           'import main; main.load("CP.cp_run")',
+    'mip':          'import main; main.load("MIP.mip_run", quiet=True)',
+    'smt':          'import main; main.load("SMT.smt_run")',
+    'portfolio':    'import main; main.load("PORTFOLIO.portfolio_run")',
+    'batch':        'import main; main.load("common.scheduler")',
+    'eager (all)':  'import CP.cp_run, MIP.mip_run, SMT.smt_run, PORTFOLIO.portfolio_run, common.scheduler',
+}
+
+def measure(code, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-W', 'ignore', '-c', code], cwd=ROOT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    base = measure(TARGETS['interpreter'], repeats)
+    print(f"{'target':<14}{'median [ms]':>12}{'imports [ms]':>14}")
+    for name, code in TARGETS.items():
+        t = base if name == 'interpreter' else measure(code, repeats)
+        print(f"{name:<14}{t * 1000:>12.1f}{(t - base) * 1000:>14.1f}")
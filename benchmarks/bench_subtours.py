@@ -0,0 +1,63 @@
+"""
+Subtour elimination in the matrix MIP model: MTZ rows in the model against lazy subtour
+cuts added while solving (Gurobi lazy constraints, HiGHS re-solve loop), with and without
+fractional separation. Reports the rows of the model, the cuts added, the objective and
+the solve time. Every measurement runs in a fresh interpreter with the heuristic upper
+bound and the strongest lower bound, no MIP start.
+
+    python benchmarks/bench_subtours.py [highs|gurobi] [time limit] [instance numbers...]
+"""
+import os
+import sys
+from child import ROOT, run_child
+
+MODES = [('mtz', 'mtz', False), ('lazy', 'lazy', False), ('lazy+frac', 'lazy', True)]
+
+CHILD = '''
+import sys, time, json
+from common.instance import Instance
+from common.bounds import strongest_bound
+from common.heuristic import heuristic_solution
+from MIP.mip_matrix import build_mcp_arrays, SOLVERS
+from MIP.mip_cuts import LAZY_SOLVERS
+
+solver, subtours, fractional, path, time_limit = sys.argv[1], sys.argv[2], sys.argv[3] == "True", sys.argv[4], int(sys.argv[5])
+instance = Instance.from_file(path)
+lower = strongest_bound(instance)
+upper, _ = heuristic_solution(instance)
+start = time.perf_counter()
+model = build_mcp_arrays(instance, False, lower, upper_bound=upper, subtours=subtours)
+to_solver, solve = SOLVERS[solver]
+solver_model = to_solver(model, time_limit, 1)
+if subtours == "lazy":
+    solution = LAZY_SOLVERS[solver](solver_model, model, time.time() + time_limit, fractional)
+else:
+    solution = solve(solver_model)
+elapsed = time.perf_counter() - start
+obj = round(solution["objective"]) if solution["objective"] is not None else -1
+print(json.dumps({"rows": model.num_row, "cuts": solution.get("cuts", 0), "obj": obj,
+                  "optimal": solution["is_optimal"], "time": elapsed}))
+'''
+
+def measure(solver, subtours, fractional, path, time_limit):
+    return run_child(CHILD, solver, subtours, fractional, path, time_limit, timeout=2 * time_limit + 300)
+
+def show(result):
+    if result is None:
+        return f"{'-':>9}{'-':>7}{'-':>8}{'-':>8}"
+    obj = f"{result['obj']}{'*' if result['optimal'] else ''}"
+    return f"{result['rows']:>9}{result['cuts']:>7}{obj:>8}{result['time']:>8.1f}"
+
+if __name__ == '__main__':
+    solver = sys.argv[1] if len(sys.argv) > 1 else 'highs'
+    time_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    numbers = sys.argv[3:] or [str(i) for i in range(1, 22)]
+    columns = f"{'rows':>9}{'cuts':>7}{'obj':>8}{'time':>8}"
+    print(f"{'':<10}" + "".join(f"{label:^{len(columns)}}" for label, _, _ in MODES))
+    print(f"{'instance':<10}" + columns * len(MODES))
+    for number in numbers:
+        name = f"inst{int(number):02d}"
+        path = os.path.join(ROOT, 'instances', name + '.dat')
+        results = [measure(solver, subtours, fractional, path, time_limit) for _, subtours, fractional in MODES]
+        print(f"{name:<10}" + "".join(show(result) for result in results), flush=True)
+    print("(* optimal; times in seconds, model construction included)")
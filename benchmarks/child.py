@@ -0,0 +1,19 @@
+"""
+Measurements in a fresh interpreter, shared by the benchmarks: the code runs from the
+repository root and prints its result as json on the last line.
+"""
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_child(code, *args, timeout=None):
+    # the json printed last by `python -c code args...`, None if the child fails, times out or prints nothing
+    try:
+        out = subprocess.run([sys.executable, '-W', 'ignore', '-c', code, *map(str, args)], cwd=ROOT,
+                             capture_output=True, text=True, timeout=timeout, check=True).stdout
+        return json.loads(out.strip().splitlines()[-1])
+    except (subprocess.TimeoutExpired, subprocess.CalledProcessError, IndexError, ValueError):
+        return None
@@ -0,0 +1,67 @@
+import numpy as np
+from common.matrix import build_mcp_arrays, highs_model
+
+LP_MAX_COLUMNS = 20000     # the LP relaxation is only solved on models up to this size
+LP_TIME_LIMIT = 10
+
+def round_trip_bound(instance):
+    # the courier delivering the farthest item travels at least depot -> item -> depot
+    d = instance.distances
+    o = instance.origin
+    return int(np.max(d[o, :o] + d[:o, o]))
+
+def min_couriers(instance):
+    # bin packing: the largest capacities must hold every item, m + 1 if even all of them can't
+    capacities = np.sort(instance.capacities.astype(np.int64))[::-1]
+    return int(np.searchsorted(np.cumsum(capacities), instance.sizes.astype(np.int64).sum()) + 1)
+
+def assignment_total(instance, routes):
+    '''
+    Assignment relaxation of the total distance of `routes` tours: every item and
+    every copy of the depot gets one successor (subtours among the items are allowed).
+    '''
+    from scipy.optimize import linear_sum_assignment
+
+    n, o = instance.n, instance.origin
+    d = instance.distances.astype(np.int64)
+    forbidden = int(d.sum()) + 1
+    cost = np.full((n + routes, n + routes), forbidden, dtype=np.int64)
+    cost[:n, :n] = d[:n, :n]
+    np.fill_diagonal(cost[:n, :n], forbidden)
+    cost[:n, n:] = d[:n, o, None]
+    cost[n:, :n] = d[None, o, :n]
+    rows, cols = linear_sum_assignment(cost)
+    return int(cost[rows, cols].sum())
+
+def assignment_bound(instance):
+    # with r couriers on the road the longest route is at least the total over r,
+    # the number of couriers used is unknown so the weakest r counts
+    couriers = range(min_couriers(instance), instance.m + 1)
+    if len(couriers) == 0:
+        # the items exceed the total capacity: no solution, the round trip is the only bound left
+        return round_trip_bound(instance)
+    return min(-(-assignment_total(instance, r) // r) for r in couriers)
+
+def lp_bound(instance, time_limit=LP_TIME_LIMIT):
+    # LP relaxation of the MIP model, None when the model is too large or it isn't solved in time
+    if instance.m * (instance.n + 1) ** 2 > LP_MAX_COLUMNS:
+        return None
+    import highspy
+
+    model = build_mcp_arrays(instance, lower_bound=round_trip_bound(instance))
+    model.integrality[:] = 0
+    h = highs_model(model, time_limit)
+    h.run()
+    if h.getModelStatus() != highspy.HighsModelStatus.kOptimal:
+        return None
+    # distances are integers, so is the optimal max distance
+    return int(np.ceil(h.getInfo().objective_function_value - 1e-6))
+
+BOUNDS = {
+    'round_trip': round_trip_bound,
+    'assignment': assignment_bound,
+    'lp': lp_bound,
+}
+
+def strongest_bound(instance, bounds=BOUNDS):
+    return max(value for value in (bound(instance) for bound in bounds.values()) if value is not None)
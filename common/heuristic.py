@@ -0,0 +1,205 @@
+import time
+import numpy as np
+from common.bounds import strongest_bound
+
+def route_length(route, d, o):
+    # route: items from 0, depot at both ends
+    if len(route) == 0:
+        return 0
+    r = np.concatenate(([o], route, [o]))
+    return int(d[r[:-1], r[1:]].sum())
+
+def balanced_assignment(instance):
+    '''
+    Routes grown in turn: the courier with the shortest closed route so far takes the
+    nearest unassigned item it can still carry. None if some item is left over.
+    '''
+    m, n, o = instance.m, instance.n, instance.origin
+    d = instance.distances.astype(np.int64)
+    sizes = instance.sizes.astype(np.int64)
+    free = instance.capacities.astype(np.int64)
+    position = np.full(m, o)
+    length = np.zeros(m, dtype=np.int64)
+    active = np.ones(m, dtype=bool)
+    unassigned = np.ones(n, dtype=bool)
+    routes = [[] for _ in range(m)]
+
+    while unassigned.any():
+        if not active.any():
+            return None
+        couriers = np.flatnonzero(active)
+        i = couriers[np.argmin((length + d[position, o])[couriers])]
+        fits = np.flatnonzero(unassigned & (sizes <= free[i]))
+        if len(fits) == 0:
+            active[i] = False
+            continue
+        j = fits[np.argmin(d[position[i], fits])]
+        routes[i].append(j)
+        length[i] += d[position[i], j]
+        position[i] = j
+        free[i] -= sizes[j]
+        unassigned[j] = False
+    return routes
+
+def packing_assignment(instance, order=None):
+    '''
+    Best fit decreasing: largest items first, each in the courier with the least room
+    left that still fits it. None if some item doesn't fit.
+    '''
+    sizes = instance.sizes.astype(np.int64)
+    free = instance.capacities.astype(np.int64)
+    routes = [[] for _ in range(instance.m)]
+    for j in (np.argsort(-sizes, kind='stable') if order is None else order):
+        room = np.where(free >= sizes[j], free, np.iinfo(np.int64).max)
+        i = np.argmin(room)
+        if free[i] < sizes[j]:
+            return None
+        routes[i].append(j)
+        free[i] -= sizes[j]
+    return routes
+
+def nearest_neighbour(items, d, o):
+    route, remaining, position = [], list(items), o
+    while remaining:
+        k = int(np.argmin(d[position, remaining]))
+        position = remaining.pop(k)
+        route.append(position)
+    return route
+
+def two_opt(route, d, o):
+    # best improving segment reversal until there is none, distances may be asymmetric
+    r = np.concatenate(([o], route, [o])).astype(np.int64)
+    if len(r) < 4:
+        return list(route)
+    a, b = np.triu_indices(len(r) - 1, 1)
+    keep = a >= 1
+    a, b = a[keep], b[keep]
+    while True:
+        forward = np.concatenate(([0], np.cumsum(d[r[:-1], r[1:]])))
+        backward = np.concatenate(([0], np.cumsum(d[r[1:], r[:-1]])))
+        # reversing r[a..b] turns the arcs inside the segment around
+        delta = (d[r[a - 1], r[b]] + d[r[a], r[b + 1]] + backward[b] - backward[a]
+                 - d[r[a - 1], r[a]] - d[r[b], r[b + 1]] - forward[b] + forward[a])
+        best = np.argmin(delta)
+        if delta[best] >= 0:
+            return r[1:-1].tolist()
+        r[a[best]:b[best] + 1] = r[a[best]:b[best] + 1][::-1].copy()
+
+def closed(route, o):
+    return np.concatenate(([o], route, [o])).astype(np.int64)
+
+def best_move(routes, lengths, loads, instance, d, o):
+    '''
+    Best relocation of an item of the longest route into another one, or exchange of an
+    item of the longest route with an item of another one, respecting the capacities.
+    (new max of the two routes, courier, position in the longest, courier, position) or None
+    '''
+    sizes, capacities = instance.sizes, instance.capacities
+    longest = int(np.argmax(lengths))
+    r = closed(routes[longest], o)
+    if len(r) < 3:
+        return None
+    items = r[1:-1]
+    prev, nxt = r[:-2], r[2:]
+    removal = d[prev, items] + d[items, nxt] - d[prev, nxt]
+    best = (lengths[longest], None)
+    for i in range(len(routes)):
+        if i == longest:
+            continue
+        q = closed(routes[i], o)
+        # relocate: items of the longest route inserted between q[t] and q[t + 1]
+        insertion = d[q[:-1], items[:, None]] + d[items[:, None], q[1:]] - d[q[:-1], q[1:]]
+        fits = loads[i] + sizes[items] <= capacities[i]
+        if fits.any():
+            cost = np.maximum(lengths[longest] - removal, lengths[i] + insertion.min(axis=1))
+            cost[~fits] = np.iinfo(np.int64).max
+            p = int(np.argmin(cost))
+            if cost[p] < best[0]:
+                best = (cost[p], ('relocate', longest, p, i, int(np.argmin(insertion[p]))))
+        if len(q) < 3:
+            continue
+        # exchange: item p of the longest route and item t of route i swap places
+        others, q_prev, q_next = q[1:-1], q[:-2], q[2:]
+        new_longest = (lengths[longest] - d[prev, items] - d[items, nxt])[:, None] \
+            + d[prev[:, None], others] + d[others, nxt[:, None]]
+        new_other = (lengths[i] - d[q_prev, others] - d[others, q_next])[None, :] \
+            + d[q_prev, items[:, None]] + d[items[:, None], q_next]
+        fits = ((loads[longest] - sizes[items][:, None] + sizes[others][None, :] <= capacities[longest])
+                & (loads[i] - sizes[others][None, :] + sizes[items][:, None] <= capacities[i]))
+        if fits.any():
+            cost = np.where(fits, np.maximum(new_longest, new_other), np.iinfo(np.int64).max)
+            p, t = np.unravel_index(np.argmin(cost), cost.shape)
+            if cost[p, t] < best[0]:
+                best = (cost[p, t], ('exchange', longest, int(p), i, int(t)))
+    return best[1]
+
+def rebalance(routes, instance, d, o, max_moves=None):
+    # moves items out of the longest route while that lowers it below the current max
+    routes = [list(route) for route in routes]
+    lengths = np.array([route_length(route, d, o) for route in routes])
+    loads = np.array([int(instance.sizes[route].sum()) for route in routes])
+    for _ in range(max_moves or 10 * instance.n):
+        move = best_move(routes, lengths, loads, instance, d, o)
+        if move is None:
+            break
+        kind, a, p, b, t = move
+        if kind == 'relocate':
+            routes[b].insert(t, routes[a].pop(p))
+        else:
+            routes[a][p], routes[b][t] = routes[b][t], routes[a][p]
+        for i in (a, b):
+            routes[i] = two_opt(routes[i], d, o)
+            lengths[i] = route_length(routes[i], d, o)
+            loads[i] = int(instance.sizes[routes[i]].sum())
+    return routes
+
+def improve(routes, instance, d, o):
+    routes = [two_opt(nearest_neighbour(route, d, o), d, o) for route in routes]
+    return rebalance(routes, instance, d, o)
+
+def heuristic_solution(instance, tries=100, seed=0):
+    '''
+    Best of the balanced nearest neighbour construction and the bin packing one, routed
+    by nearest neighbour and 2-opt and balanced by moving items out of the longest
+    route. (obj, sol) with items from 1, (None, None) if
+    no assignment respecting the capacities was found.
+    '''
+    d = instance.distances.astype(np.int64)
+    o = instance.origin
+    candidates = [balanced_assignment(instance), packing_assignment(instance)]
+    if all(routes is None for routes in candidates):
+        # tight capacities: first fit in random item orders
+        rng = np.random.default_rng(seed)
+        for _ in range(tries):
+            routes = packing_assignment(instance, rng.permutation(instance.n))
+            if routes is not None:
+                candidates.append(routes)
+                break
+
+    best_obj, best_sol = None, None
+    for routes in candidates:
+        if routes is None:
+            continue
+        routes = improve(routes, instance, d, o)
+        obj = max(route_length(route, d, o) for route in routes)
+        if best_obj is None or obj < best_obj:
+            best_obj, best_sol = obj, [[int(j) + 1 for j in route] for route in routes]
+    return best_obj, best_sol
+
+def heuristic_result(instance, lower_bound=None):
+    # the result format of the approaches: the fallback when a solver finds nothing
+    start_time = time.time()
+    obj, sol = heuristic_solution(instance)
+    lower_bound = strongest_bound(instance) if lower_bound is None else lower_bound
+    return {
+        'time': int(time.time() - start_time),
+        'optimal': obj is not None and obj <= lower_bound,
+        'obj': obj,
+        'sol': sol if sol is not None else []
+    }
+
+def fallback(result, heuristic):
+    # a timed out solver (no solution) reports the heuristic one, never optimal
+    if heuristic is None or heuristic['obj'] is None or result['sol']:
+        return result
+    return {'time': result['time'], 'optimal': False, 'obj': heuristic['obj'], 'sol': heuristic['sol']}
@@ -0,0 +1,44 @@
+import copy
+import multiprocessing
+
+# best objective found so far by the pipelines racing on one instance (PORTFOLIO), -1 while there is none
+
+class Incumbent:
+    '''
+    The objective shared by the pipelines. With the results queue of the portfolio, every
+    solution improving it is also sent there as ('incumbent', pipeline, result): a pipeline
+    stopped at the deadline has already handed over its best tours.
+    '''
+    def __init__(self, results=None):
+        self.shared = multiprocessing.Value('i', -1)
+        self.results = results
+        self.name = None
+
+    def pipeline(self, name):
+        # the same objective, the solutions sent on behalf of pipeline name
+        incumbent = copy.copy(self)
+        incumbent.name = name
+        return incumbent
+
+def shared_incumbent(obj=None, results=None):
+    incumbent = Incumbent(results)
+    publish_incumbent(incumbent, obj)
+    return incumbent
+
+def read_incumbent(incumbent, upper=None):
+    # the tighter of upper and the shared objective, None if neither is known
+    value = incumbent.shared.value if incumbent is not None else -1
+    if value < 0:
+        return upper
+    return value if upper is None else min(upper, value)
+
+def publish_incumbent(incumbent, obj, sol=None):
+    # sol: the tours of obj (items from 1), sent to the portfolio when they improve the objective
+    if incumbent is None or obj is None or obj < 0:
+        return
+    with incumbent.shared.get_lock():
+        improved = incumbent.shared.value < 0 or obj < incumbent.shared.value
+        if improved:
+            incumbent.shared.value = int(obj)
+    if improved and sol and incumbent.results is not None:
+        incumbent.results.put(('incumbent', incumbent.name, {'optimal': False, 'obj': int(obj), 'sol': sol}))
@@ -0,0 +1,37 @@
+import os
+import numpy as np
+
+class Instance:
+    '''
+    MCP instance as contiguous arrays, shared by every approach.
+    Locations 0..n-1 are the items, location n (origin) is the depot.
+    '''
+    __slots__ = ('name', 'm', 'n', 'capacities', 'sizes', 'distances')
+
+    def __init__(self, name, m, n, capacities, sizes, distances):
+        self.name = name
+        self.m = int(m)     # n. couriers
+        self.n = int(n)     # n. items
+        self.capacities = np.ascontiguousarray(capacities, dtype=np.int32)             # courier load
+        self.sizes = np.ascontiguousarray(sizes, dtype=np.int32)                       # item size
+        self.distances = np.ascontiguousarray(distances, dtype=np.int32).reshape(n + 1, n + 1)
+
+    def __repr__(self):
+        return f"Instance(name={self.name}, m={self.m}, n={self.n})"
+
+    @property
+    def origin(self):
+        return self.n
+
+    @classmethod
+    def from_file(cls, path):
+        name = '.'.join(os.path.basename(path).split('.')[:-1])
+        with open(path, 'r') as f:
+            values = np.fromstring(f.read(), dtype=np.int32, sep=' ')
+        m, n = int(values[0]), int(values[1])
+        if len(values) != 2 + m + n + (n + 1) ** 2:
+            raise ValueError(f"{path}: expected {2 + m + n + (n + 1) ** 2} values, found {len(values)}")
+        capacities = values[2:2 + m]
+        sizes = values[2 + m:2 + m + n]
+        distances = values[2 + m + n:]
+        return cls(name, m, n, capacities, sizes, distances)
@@ -0,0 +1,192 @@
+import numpy as np
+from common.preprocessing import prune_arcs
+
+# the MIP model as sparse arrays: solved by the matrix backend (MIP/mip_matrix.py), relaxed by common.bounds.lp_bound
+
+class MatrixModel:
+    '''
+    build_mcp_model formulation as sparse arrays: the constraint matrix is CSR
+    (start, index, value), rows are row_lower <= A v <= row_upper.
+    Column layout: x[i][j] | y[i][j][k] (j, k in 0..n, n is the depot) | u[i][j] | Z
+    distances: the instance distance matrix, to evaluate tours against the model
+    '''
+    __slots__ = ('m', 'n', 'cost', 'col_lower', 'col_upper', 'integrality',
+                 'start', 'index', 'value', 'row_lower', 'row_upper', 'distances')
+
+    def __init__(self, m, n):
+        self.m = m
+        self.n = n
+
+    @property
+    def num_col(self):
+        return len(self.cost)
+
+    @property
+    def num_row(self):
+        return len(self.row_lower)
+
+    def x_col(self, i, j):
+        return i * self.n + j
+
+    def y_col(self, i, j, k):
+        return self.m * self.n + (i * (self.n + 1) + j) * (self.n + 1) + k
+
+    def u_col(self, i, j):
+        return self.m * self.n + self.m * (self.n + 1) ** 2 + i * self.n + j
+
+    def z_col(self):
+        return self.num_col - 1
+
+class _Rows:
+    # COO triplets collected block by block, one block of rows at a time
+    def __init__(self):
+        self.rows, self.cols, self.vals = [], [], []
+        self.lower, self.upper = [], []
+        self.count = 0
+
+    def add(self, rows, cols, vals, lower, upper, n_rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        self.rows.append(rows.ravel() + self.count)
+        self.cols.append(np.asarray(cols, dtype=np.int64).ravel())
+        self.vals.append(np.broadcast_to(np.asarray(vals, dtype=np.float64), rows.shape).ravel())
+        self.lower.append(np.broadcast_to(np.asarray(lower, dtype=np.float64), (n_rows,)))
+        self.upper.append(np.broadcast_to(np.asarray(upper, dtype=np.float64), (n_rows,)))
+        self.count += n_rows
+
+    def to_csr(self, dropped=None):
+        # dropped: columns fixed to 0, left out of every row
+        rows, cols, vals = np.concatenate(self.rows), np.concatenate(self.cols), np.concatenate(self.vals)
+        if dropped is not None:
+            keep = ~dropped[cols]
+            rows, cols, vals = rows[keep], cols[keep], vals[keep]
+        order = np.argsort(rows, kind='stable')
+        start = np.zeros(self.count + 1, dtype=np.int32)
+        np.cumsum(np.bincount(rows, minlength=self.count), out=start[1:])
+        index = cols[order].astype(np.int32)
+        value = vals[order]
+        return start, index, value, np.concatenate(self.lower), np.concatenate(self.upper)
+
+def build_mcp_arrays(instance, add_symmetry_break=False, lower_bound=None, arcs=None, upper_bound=None,
+                     subtours='mtz'):
+    # subtours='lazy' leaves the MTZ rows out (u fixed to 0), the subtours are cut off while solving (mip_cuts)
+    m, n = instance.m, instance.n
+    o = instance.origin
+    sizes = instance.sizes.astype(np.float64)
+    capacities = instance.capacities.astype(np.float64)
+    d = instance.distances.astype(np.float64)
+    inf = np.inf
+
+    model = MatrixModel(m, n)
+    model.distances = instance.distances
+    nx, ny, nu = m * n, m * (n + 1) ** 2, m * n
+    num_col = nx + ny + nu + 1
+
+    I = np.arange(m)
+    J = np.arange(n)
+    X = np.arange(nx).reshape(m, n)                         # x[i][j]
+    Y = (nx + np.arange(ny)).reshape(m, n + 1, n + 1)       # y[i][j][k]
+    U = (nx + ny + np.arange(nu)).reshape(m, n)             # u[i][j]
+    Z = num_col - 1
+
+    # Objective - minimize max distance per courier
+    cost = np.zeros(num_col)
+    cost[Z] = 1
+    col_lower = np.zeros(num_col)
+    col_upper = np.ones(num_col)
+    col_lower[U] = 1
+    col_upper[U] = n
+    col_lower[Z] = lower_bound if lower_bound is not None else 0
+    col_upper[Z] = upper_bound if upper_bound is not None else inf
+    # y only for the arcs left by the preprocessing (never the self loops, they mess up MTZ):
+    # the other columns keep their index but are fixed to 0 and left out of the rows
+    if arcs is None:
+        arcs = prune_arcs(instance, upper_bound)
+    dropped = np.zeros(num_col, dtype=bool)
+    dropped[Y[~arcs.allowed]] = True
+    if subtours == 'lazy':
+        dropped[U] = True
+        col_lower[U] = 0
+    col_upper[dropped] = 0
+    integrality = np.ones(num_col, dtype=np.int32)
+    integrality[Z] = 0
+
+    rows = _Rows()
+    # Assign each item to exactly one courier
+    rows.add(np.broadcast_to(J, (m, n)), X, 1, 1, 1, n)
+    # Respect capacity limits
+    rows.add(np.broadcast_to(I[:, None], (m, n)), X, sizes, -inf, capacities, m)
+
+    depot_out = Y[:, o, :n]
+    depot_in = Y[:, :n, o]
+    row_i = np.broadcast_to(I[:, None], (m, n))
+    # Courier leaves the depot at most once
+    rows.add(row_i, depot_out, 1, -inf, 1, m)
+    # Only leave depot if you have items
+    rows.add(np.concatenate([row_i, row_i], axis=1), np.concatenate([depot_out, X], axis=1),
+             np.concatenate([np.ones((m, n)), -np.ones((m, n))], axis=1), -inf, 0, m)
+    # Ensure round trip (same in and out arcs at depot)
+    rows.add(np.concatenate([row_i, row_i], axis=1), np.concatenate([depot_out, depot_in], axis=1),
+             np.concatenate([np.ones((m, n)), -np.ones((m, n))], axis=1), 0, 0, m)
+
+    # Flow conservation, one row per (i, j): sum_k y[i][k][j] - x[i][j] = 0 and sum_k y[i][j][k] - x[i][j] = 0
+    # (pruned arcs, the k = j term among them, are dropped by to_csr)
+    row_ij = np.arange(m * n).reshape(m, n)
+    flow_rows = np.concatenate([np.broadcast_to(row_ij[:, :, None], (m, n, n + 1)).reshape(m * n, -1),
+                                row_ij.reshape(-1, 1)], axis=1)
+    flow_vals = np.concatenate([np.ones((m * n, n + 1)), -np.ones((m * n, 1))], axis=1)
+    rows.add(flow_rows, np.concatenate([Y[:, :, :n].transpose(0, 2, 1).reshape(m * n, -1), X.reshape(-1, 1)], axis=1),
+             flow_vals, 0, 0, m * n)
+    rows.add(flow_rows, np.concatenate([Y[:, :n, :].reshape(m * n, -1), X.reshape(-1, 1)], axis=1),
+             flow_vals, 0, 0, m * n)
+
+    # Subtour elimination (MTZ-style): u[i][j] - u[i][k] + n * y[i][j][k] <= n - 1, for the arcs left
+    if subtours == 'mtz':
+        ii, jj, kk = np.nonzero(arcs.allowed[:, :n, :n])
+        n_mtz = len(ii)
+        mtz_rows = np.broadcast_to(np.arange(n_mtz)[:, None], (n_mtz, 3))
+        mtz_cols = np.stack([U[ii, jj], U[ii, kk], Y[ii, jj, kk]], axis=-1)
+        rows.add(mtz_rows, mtz_cols, np.array([1, -1, n]), -inf, n - 1, n_mtz)
+
+    # Z should bound each courier's total distance
+    off_diag = ~np.eye(n + 1, dtype=bool)
+    jj, kk = np.nonzero(off_diag)
+    row_dist = np.concatenate([np.broadcast_to(I[:, None], (m, len(jj))), I[:, None]], axis=1)
+    col_dist = np.concatenate([Y[:, jj, kk], np.full((m, 1), Z)], axis=1)
+    val_dist = np.concatenate([np.broadcast_to(d[jj, kk], (m, len(jj))), -np.ones((m, 1))], axis=1)
+    rows.add(row_dist, col_dist, val_dist, -inf, 0, m)
+
+    # Optional symmetry breaking: identical couriers sorted by load
+    if add_symmetry_break:
+        pairs = []
+        for cap in np.unique(capacities):
+            group = np.flatnonzero(capacities == cap)
+            pairs.extend(zip(group[:-1], group[1:]))
+        if pairs:
+            curr, nxt = np.array(pairs).T
+            row_sb = np.broadcast_to(np.arange(len(pairs))[:, None], (len(pairs), 2 * n))
+            col_sb = np.concatenate([X[curr], X[nxt]], axis=1)
+            val_sb = np.concatenate([np.broadcast_to(sizes, (len(pairs), n)),
+                                     -np.broadcast_to(sizes, (len(pairs), n))], axis=1)
+            rows.add(row_sb, col_sb, val_sb, 0, inf, len(pairs))
+
+    model.cost, model.col_lower, model.col_upper, model.integrality = cost, col_lower, col_upper, integrality
+    model.start, model.index, model.value, model.row_lower, model.row_upper = rows.to_csr(dropped)
+    return model
+
+def highs_model(model, time_limit_sec=305, threads=None, start=None):
+    import highspy
+
+    h = highspy.Highs()
+    h.setOptionValue('output_flag', False)
+    h.setOptionValue('time_limit', float(time_limit_sec))
+    if threads is not None:
+        h.setOptionValue('threads', threads)
+    h.passModel(
+        model.num_col, model.num_row, len(model.index),
+        int(highspy.MatrixFormat.kRowwise), int(highspy.ObjSense.kMinimize), 0.0,
+        model.cost, model.col_lower, model.col_upper, model.row_lower, model.row_upper,
+        model.start, model.index, model.value, model.integrality
+    )
+    if start is not None:
+        h.setSolution(model.num_col, np.arange(model.num_col, dtype=np.int32), start)
+    return h
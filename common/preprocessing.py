@@ -0,0 +1,79 @@
+import numpy as np
+
+class ArcSet:
+    '''
+    Arcs that can still appear in a solution no worse than the upper bound.
+    allowed[i, j, k]: courier i may travel from j to k (locations 0..n, n is the depot)
+    '''
+    __slots__ = ('m', 'n', 'allowed')
+
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.m = allowed.shape[0]
+        self.n = allowed.shape[1] - 1
+
+    @property
+    def arcs(self):
+        # union over the couriers, for the models sharing one graph among them
+        return self.allowed.any(axis=0)
+
+    def out_arcs(self, i, j):
+        return np.flatnonzero(self.allowed[i, j]).tolist()
+
+    def in_arcs(self, i, k):
+        return np.flatnonzero(self.allowed[i, :, k]).tolist()
+
+def shortest_paths(d):
+    # Floyd-Warshall, one vectorized relaxation per intermediate location
+    sp = d.astype(np.int64)
+    for k in range(len(sp)):
+        np.minimum(sp, sp[:, k, None] + sp[None, k, :], out=sp)
+    return sp
+
+def prune_arcs(instance, upper_bound=None):
+    m, n, o = instance.m, instance.n, instance.origin
+    sizes = instance.sizes.astype(np.int64)
+    capacities = instance.capacities.astype(np.int64)
+
+    allowed = np.ones((m, n + 1, n + 1), dtype=bool)
+    allowed[:, np.arange(n + 1), np.arange(n + 1)] = False     # no self loops
+
+    # courier i can't carry item j, so it can't reach or leave it
+    carries = sizes[None, :] <= capacities[:, None]
+    allowed[:, :n, :] &= carries[:, :, None]
+    allowed[:, :, :n] &= carries[:, None, :]
+    # items that don't fit together in courier i aren't consecutive in its route
+    allowed[:, :n, :n] &= (sizes[:, None] + sizes[None, :])[None, :, :] <= capacities[:, None, None]
+
+    if upper_bound is not None:
+        # any route using j -> k is at least depot ~> j -> k ~> depot long
+        # (shortest paths, so the bound holds without the triangle inequality)
+        sp = shortest_paths(instance.distances)
+        through = sp[o, :, None] + instance.distances + sp[None, :, o]
+        allowed &= (through <= upper_bound)[None, :, :]
+
+    return ArcSet(allowed)
+
+def pruning_stats(instance, arcs):
+    '''
+    What the arc set removes from each model: MIP y variables and the MTZ and flow
+    terms they appear in, SMT travels terms, CP edges.
+    '''
+    n = instance.n
+    full = np.ones_like(arcs.allowed)
+    full[:, np.arange(n + 1), np.arange(n + 1)] = False
+    removed = full & ~arcs.allowed
+    mtz_removed = removed[:, :n, :n].sum()
+    # a y column is in the distance row and the flow rows of both ends, the depot ones
+    # also in the three depot rows, an MTZ row has three nonzeros
+    nonzeros_removed = 3 * removed.sum() + 2 * removed[:, n, :].sum() + 3 * mtz_removed
+    cp_edges = (n + 1) * n                  # item/start -> item, item -> end
+    return {
+        'arcs': int(full.sum()),
+        'arcs_removed': int(removed.sum()),
+        'mip_vars_removed': int(removed.sum()),
+        'mip_mtz_removed': int(mtz_removed),
+        'mip_nonzeros_removed': int(nonzeros_removed),
+        'smt_terms_removed': int(removed.sum()),
+        'cp_edges_removed': int(cp_edges - arcs.arcs[:, :n].sum() - arcs.arcs[:n, n].sum()),
+    }
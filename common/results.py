@@ -0,0 +1,36 @@
+import os
+import json
+import numpy as np
+
+def evaluate(instance, sol):
+    # max route length of sol (items from 1, as in the results), None if it isn't a valid assignment
+    if len(sol) != instance.m:
+        return None
+    items = np.array([item - 1 for tour in sol for item in tour], dtype=np.int64)
+    if len(items) != instance.n or not np.array_equal(np.sort(items), np.arange(instance.n)):
+        return None
+    o, d = instance.origin, instance.distances
+    longest = 0
+    for i, tour in enumerate(sol):
+        if not tour:
+            continue
+        route = np.array([o] + [item - 1 for item in tour] + [o])
+        if instance.sizes[route[1:-1]].sum() > instance.capacities[i]:
+            return None
+        longest = max(longest, int(d[route[:-1], route[1:]].sum()))
+    return longest
+
+def best_result(instance, res_dir='res'):
+    # best valid solution stored for the instance by any approach: (obj, sol), (None, None) if there is none
+    best_obj, best_sol = None, None
+    for approach in sorted(os.listdir(res_dir)) if os.path.isdir(res_dir) else []:
+        path = os.path.join(res_dir, approach, f"{instance.name}.json")
+        if not os.path.exists(path):
+            continue
+        with open(path) as f:
+            data = json.load(f)
+        for result in data.values():
+            obj = evaluate(instance, result.get('sol') or [])
+            if obj is not None and (best_obj is None or obj < best_obj):
+                best_obj, best_sol = obj, result['sol']
+    return best_obj, best_sol
@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# every run of every approach; res/<APPROACH>/<instance>.json (read by check_solution.py) is exported from it
+DB_PATH = 'results.db'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    run_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+    instance TEXT    NOT NULL,      -- inst01
+    approach TEXT    NOT NULL,      -- the folder in res/: CP, MIP, SMT, HEUR, PORTFOLIO
+    solver   TEXT    NOT NULL,
+    symbreak INTEGER NOT NULL,
+    key      TEXT    NOT NULL,      -- the entry in res/<approach>/<instance>.json
+    time     INTEGER,
+    optimal  INTEGER,
+    obj      INTEGER,
+    solved   INTEGER NOT NULL,      -- the result has a solution
+    result   TEXT    NOT NULL,      -- the whole entry, json
+    created  REAL    NOT NULL,
+    exported INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS results_config ON results (instance, approach, solver, symbreak, run_id);
+CREATE INDEX IF NOT EXISTS results_entry ON results (approach, instance, key, run_id);
+CREATE INDEX IF NOT EXISTS results_best ON results (instance, obj) WHERE solved = 1;
+CREATE INDEX IF NOT EXISTS results_pending ON results (approach, instance) WHERE exported = 0;
+'''
+
+# open connections by (database, process, thread): a sqlite3 connection is not shared across forks or threads
+_connections = {}
+
+def connect(path=DB_PATH):
+    # autocommit, transactions are explicit; WAL: the batch and portfolio workers write concurrently
+    key = (os.path.abspath(path), os.getpid(), threading.get_ident())
+    if key not in _connections:
+        connection = sqlite3.connect(path, timeout=60, isolation_level=None)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.executescript(SCHEMA)
+        _connections[key] = connection
+    return _connections[key]
+
+@contextmanager
+def transaction(connection):
+    # the write lock from the start: no row is added between reading and marking as exported
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield connection
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+def record_result(approach, instance, key, result, solver=None, symbreak=False, run_id=None,
+                  path=DB_PATH, res_dir='res', export=True):
+    '''
+    Appends the result of a run, or replaces it when run_id (returned by the previous call)
+    is given, e.g. the improving solutions of a streaming run. Then exports the changed
+    res/<approach>/<instance>.json, unless export is False (intermediate results: they
+    are exported by the next call that exports). Returns the run_id.
+    '''
+    values = (result.get('time'), int(bool(result.get('optimal'))), result.get('obj'),
+              int(bool(result.get('sol'))), json.dumps(result), time.time())
+    connection = connect(path)
+    with transaction(connection):
+        if run_id is None:
+            run_id = connection.execute(
+                'INSERT INTO results (instance, approach, solver, symbreak, key, '
+                'time, optimal, obj, solved, result, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (instance, approach, solver or key, int(bool(symbreak)), key) + values).lastrowid
+        else:
+            connection.execute(
+                'UPDATE results SET time = ?, optimal = ?, obj = ?, solved = ?, result = ?, created = ?, '
+                'exported = 0 WHERE run_id = ?', values + (run_id,))
+    if export:
+        export_results(connection, res_dir)
+    return run_id
+
+def export_results(connection, res_dir='res'):
+    '''
+    Rewrites only the res/<approach>/<instance>.json files with rows not exported yet, with
+    the latest run of every key (keys the store doesn't know are kept). Returns their paths.
+    '''
+    written = []
+    with transaction(connection):
+        pending = connection.execute('SELECT DISTINCT approach, instance FROM results WHERE exported = 0').fetchall()
+        for approach, instance in pending:
+            rows = connection.execute(
+                'SELECT key, result FROM results AS r WHERE approach = ? AND instance = ? AND run_id = '
+                '(SELECT MAX(run_id) FROM results WHERE approach = r.approach AND instance = r.instance AND key = r.key)',
+                (approach, instance)).fetchall()
+            output_path = os.path.join(res_dir, approach, f"{instance}.json")
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            data = {}
+            if os.path.exists(output_path):
+                with open(output_path) as f:
+                    data = json.load(f)
+            data.update({key: json.loads(result) for key, result in rows})
+            with open(output_path, 'w') as f:
+                json.dump(data, f, indent=4)
+            connection.execute('UPDATE results SET exported = 1 WHERE approach = ? AND instance = ? AND exported = 0',
+                               (approach, instance))
+            written.append(output_path)
+    return written
+
+def export_pending(path=DB_PATH, res_dir='res'):
+    # the res/ files of the rows recorded with export=False
+    return export_results(connect(path), res_dir)
+
+def import_results(res_dir='res', path=DB_PATH):
+    # the entries already in res/ as runs (exported), e.g. before the first run with the store
+    rows = []
+    for approach in sorted(os.listdir(res_dir)) if os.path.isdir(res_dir) else []:
+        folder = os.path.join(res_dir, approach)
+        for name in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+            with open(os.path.join(folder, name)) as f:
+                data = json.load(f)
+            for key, result in data.items():
+                symbreak = key.startswith('SB_') or key.endswith('symbreak')
+                rows.append((name.split('.')[0], approach, key, int(symbreak), key, result.get('time'),
+                             int(bool(result.get('optimal'))), result.get('obj'), int(bool(result.get('sol'))),
+                             json.dumps(result), time.time()))
+    connection = connect(path)
+    with transaction(connection):
+        connection.executemany(
+            'INSERT INTO results (instance, approach, solver, symbreak, key, time, optimal, obj, solved, '
+            'result, created, exported) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)', rows)
+    return len(rows)
+
+def best_known(path=DB_PATH):
+    # best objective of every instance over all the runs with a solution: {instance: {obj, optimal, approach, key}}
+    # the first run with the least obj, an optimal one if any
+    rows = connect(path).execute(
+        'SELECT instance, obj, optimal, approach, key FROM '
+        '(SELECT instance, obj, optimal, approach, key, ROW_NUMBER() OVER '
+        '(PARTITION BY instance ORDER BY obj, optimal DESC, run_id) AS rank FROM results WHERE solved = 1) '
+        'WHERE rank = 1 ORDER BY instance').fetchall()
+    return {instance: {'obj': obj, 'optimal': bool(optimal), 'approach': approach, 'key': key}
+            for instance, obj, optimal, approach, key in rows}
@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import queue
+import importlib
+import multiprocessing
+from collections import namedtuple
+from tqdm import tqdm
+from common.workers import start_worker, stop_worker, available_cores
+from common.instance import Instance
+from common.heuristic import heuristic_solution, fallback
+
+MAX_TIME = 300
+GRACE_TIME = 5      # on top of MAX_TIME, the solvers stop themselves at MAX_TIME
+
+APPROACHES = {
+    'cp':  'CP.cp_run',
+    'mip': 'MIP.mip_run',
+    'smt': 'SMT.smt_run',
+}
+SOLVERS = {
+    'cp':  ['gecode', 'chuffed'],
+    'mip': ['highs', 'gurobi'],
+    'smt': ['z3'],
+}
+# threads given to each solver run (HiGHS/Gurobi Threads, Gecode -p, z3 parallel.threads.max)
+SOLVER_THREADS = {
+    'gecode':  1,
+    'chuffed': 1,   # sequential only
+    'highs':   1,
+    'gurobi':  1,
+    'z3':      1,
+}
+# what an approach writes when the run is killed
+TIMEOUT_OBJ = {
+    'cp':  -1,
+    'mip': -1,
+    'smt': 0,
+}
+
+Job = namedtuple('Job', ['approach', 'solver', 'symbreak', 'instance'])
+
+def build_jobs(approaches=None, solvers=None, symbreaks=(False, True), instances=None):
+    approaches = list(APPROACHES) if approaches is None else approaches
+    if instances is None:
+        instances = [str(i + 1) for i in range(len(os.listdir(os.path.abspath('instances'))))]
+    jobs = []
+    for instance in instances:
+        for approach in approaches:
+            for solver in SOLVERS[approach]:
+                if solvers is not None and solver not in solvers:
+                    continue
+                for symbreak in symbreaks:
+                    jobs.append(Job(approach, solver, symbreak, str(instance)))
+    return jobs
+
+def timeout_result(job):
+    return {
+        'time' : MAX_TIME,
+        'optimal' : False,
+        'obj' : TIMEOUT_OBJ[job.approach],
+        'sol': []
+        }
+
+def failed_result(job):
+    # a job that failed or was killed reports the heuristic solution, not an empty one over its res/ entry
+    try:
+        instance = Instance.from_file(os.path.join(os.path.abspath('instances'), f"inst{int(job.instance):02d}.dat"))
+        obj, sol = heuristic_solution(instance)
+    except Exception as e:
+        print(f"{job}: no heuristic solution: {e}", file=sys.stderr)
+        return timeout_result(job)
+    return fallback(timeout_result(job), {'obj': obj, 'sol': sol})
+
+def job_worker(results, job, threads):
+    try:
+        module = importlib.import_module(APPROACHES[job.approach])
+        kwargs = {} if job.approach == 'smt' else {'solver_name': job.solver}
+        result = module.solve_instance(
+            instance_name=job.instance,
+            symbreak=job.symbreak,
+            threads=threads,
+            **kwargs
+        )
+    except Exception as e:
+        print(f"{job} failed: {e}", file=sys.stderr)
+        result = failed_result(job)
+    results.put((job, result))
+
+def store_result(job, result):
+    module = importlib.import_module(APPROACHES[job.approach])
+    kwargs = {} if job.approach == 'smt' else {'solver_name': job.solver}
+    module.store_result(result, instance_name=job.instance, symbreak=job.symbreak, **kwargs)
+
+def run_jobs(jobs, cores=None, threads=None, time_limit=MAX_TIME):
+    """
+    Runs the jobs on a pool of worker processes. A job starts only when the threads its
+    solver is allowed to use fit in the remaining core budget, so the machine is never
+    oversubscribed. Every result is written as soon as its job ends.
+    """
+    available = available_cores()
+    cores = len(available) if cores is None else cores
+    threads = {**SOLVER_THREADS, **(threads or {})}
+    # pin the jobs only when the budget fits the machine
+    free_cores = set(available[:cores]) if cores <= len(available) else None
+    budget = cores
+
+    pending = list(jobs)
+    running = {}    # job -> (process, start time, pinned cores, threads)
+    results = multiprocessing.Queue()
+    pbar = tqdm(total=len(pending), desc="Running jobs")
+
+    def finish(job, result, reported=True):
+        nonlocal budget
+        p, _, pinned, t = running.pop(job)
+        if reported:
+            # killing it while it still flushes the queue would leave the queue locked
+            p.join(GRACE_TIME)
+        stop_worker(p)
+        budget += t
+        if free_cores is not None:
+            free_cores.update(pinned)
+        store_result(job, result)
+        pbar.set_description(f"{job.approach} {job.solver} sb={job.symbreak} inst {job.instance}: obj {result['obj']}")
+        pbar.update()
+
+    while pending or running:
+        for job in list(pending):
+            t = min(threads[job.solver], cores)
+            if t > budget:
+                continue
+            pinned = None
+            if free_cores is not None:
+                pinned = set(sorted(free_cores)[:t])
+                free_cores.difference_update(pinned)
+            budget -= t
+            pending.remove(job)
+            running[job] = (start_worker(job_worker, results, job, t, cores=pinned), time.time(), pinned, t)
+
+        try:
+            job, result = results.get(timeout=1)
+            if job in running:
+                finish(job, result)
+        except queue.Empty:
+            pass
+
+        for job, (p, start, _, _) in list(running.items()):
+            if time.time() - start > time_limit + GRACE_TIME:
+                finish(job, failed_result(job), reported=False)
+            elif not p.is_alive() and results.empty():
+                # died without reporting anything
+                finish(job, failed_result(job), reported=False)
+    pbar.close()
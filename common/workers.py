@@ -0,0 +1,43 @@
+import os
+import signal
+import multiprocessing
+
+def _worker_entry(cores, target, args, kwargs):
+    # own process group, so that solver binaries spawned by the worker
+    # (highs, gurobi_cl, minizinc, ...) are stopped together with it
+    try:
+        os.setsid()
+    except OSError:
+        pass
+    if cores is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cores)
+        except OSError:
+            pass
+    target(*args, **kwargs)
+
+def start_worker(target, *args, cores=None, **kwargs):
+    p = multiprocessing.Process(target=_worker_entry, args=(cores, target, args, kwargs))
+    p.start()
+    return p
+
+def stop_worker(p, grace=2):
+    if not p.is_alive():
+        p.join()
+        return
+    try:
+        os.killpg(p.pid, signal.SIGTERM)
+    except (ProcessLookupError, PermissionError):
+        p.terminate()
+    p.join(grace)
+    if p.is_alive():
+        try:
+            os.killpg(p.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            p.kill()
+        p.join()
+
+def available_cores():
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
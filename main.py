@@ -1,46 +1,123 @@
 import sys
-from CP.cp_run import execute_cp
 import os
+import importlib
 from contextlib import redirect_stdout, redirect_stderr
-# Suppress Gurobi license messages during import
-with open(os.devnull, 'w') as devnull:
-    with redirect_stdout(devnull), redirect_stderr(devnull):
-        from MIP.mip_run import execute_mip
-from SMT.smt_run import execute_smt
+
+def load(module_name, quiet=False):
+    # the solver stacks are imported only for the selected approach
+    if not quiet:
+        return importlib.import_module(module_name)
+    # Suppress Gurobi license messages during import
+    with open(os.devnull, 'w') as devnull:
+        with redirect_stdout(devnull), redirect_stderr(devnull):
+            return importlib.import_module(module_name)
+
+def parse_options(options):
+    # trailing key=value arguments, e.g. backend=matrix
+    parsed = {}
+    for option in options:
+        key, value = option.split("=", 1)
+        if value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        elif value.isdigit():
+            value = int(value)
+        parsed[key] = value
+    return parsed
+
+def run_cp(solver, symbreak, instance, *options):
+    # EXAMPLE: python main.py cp gecode False 1
+    # EXAMPLE: python main.py cp gecode False all cores=2
+    # with all, the four solver/symmetry breaking configurations of an instance run concurrently on `cores` cores
+    # model=succ: successor model with subcircuit (cp_succ.mzn) instead of bounded_dpath (cp.mzn)
+    # profile=<name in CP/profiles.json>, seed=, free_search=, restart=, restart_scale=, varsel=, processes=
+    # sweep=true [profiles=a,b] [time_limit=60]: rank the profiles by time to optimal
+    load("CP.cp_run").execute_cp(
+        instance_name=instance,
+        solver_name=solver,
+        symbreak=bool(symbreak),
+        **parse_options(options)
+    )
+
+def run_mip(solver, symbreak, instance, *options):
+    # EXAMPLE: python main.py mip gurobi False 1
+    # You can choose between gurobi and highs
+    # EXAMPLE: python main.py mip highs False 20 backend=matrix
+    # backend=matrix builds the model as NumPy arrays passed directly to highspy/gurobipy
+    # in_memory=true solves the PuLP model through highspy/gurobipy instead of the solver binaries
+    # warm_start=true starts the solver from the best tours already in res/ (or the heuristic ones)
+    # formulation=compact uses arcs shared by all the couriers instead of one set per courier
+    # subtours=lazy (backend=matrix) drops MTZ and cuts off subtours while solving, fractional_cuts=true also on the LP
+    load("MIP.mip_run", quiet=True).execute_mip(
+        solver_name=solver,
+        symbreak=bool(symbreak),
+        instance_name=instance,
+        **parse_options(options)
+        )
+
+def run_smt(solver, symbreak, instance, *options):
+    # EXAMPLE: python main.py smt z3 False 1
+    # The only solver supported is z3
+    # encoding=array uses explicit Bool/Int variables instead of uninterpreted functions
+    # search=binary (or linear) bisects max_dist with a plain z3 Solver, keeping the best model on timeout
+    load("SMT.smt_run").execute_smt(
+        symbreak=bool(symbreak),
+        instance_name=instance,
+        **parse_options(options)
+    )
+
+def run_heuristic(solver, symbreak, instance, *options):
+    # EXAMPLE: python main.py heuristic alns False 17
+    # alns improves the constructive heuristic (greedy) until the time limit or the lower bound
+    # EXAMPLE: python main.py heuristic alns False 17 time_limit=60 seed=1
+    load("HEUR.heur_run").execute_heuristic(
+        solver_name=solver,
+        symbreak=bool(symbreak),
+        instance_name=instance,
+        **parse_options(options)
+    )
+
+def run_portfolio(solver, symbreak, instance, *options):
+    # EXAMPLE: python main.py portfolio all False 1
+    # CP (gecode, chuffed), MIP (highs, gurobi), SMT (z3) and ALNS race on the instance
+    # EXAMPLE: python main.py portfolio all False 13 time_limit=60 pipelines=heur_alns,smt_z3
+    load("PORTFOLIO.portfolio_run").execute_portfolio(
+        symbreak=bool(symbreak),
+        instance_name=instance,
+        **parse_options(options)
+    )
+
+def run_batch(solver, symbreak, instance, *options):
+    # EXAMPLE: python main.py batch all all all 32
+    # every (approach, solver, symbreak, instance) combination, on a budget of 32 cores
+    # solver, symbreak and instance can be restricted as usual (e.g. highs true all)
+    scheduler = load("common.scheduler")
+    cores = int(options[0]) if options else None
+    solvers = None if solver == "all" else [solver]
+    approaches = [a for a, names in scheduler.SOLVERS.items() if solvers is None or solver in names]
+    symbreaks = (False, True) if symbreak is None else (symbreak,)
+    instances = None if instance == "all" else [instance]
+    scheduler.run_jobs(scheduler.build_jobs(approaches, solvers, symbreaks, instances), cores=cores)
+
+APPROACHES = {
+    "cp": run_cp,
+    "mip": run_mip,
+    "smt": run_smt,
+    "heuristic": run_heuristic,
+    "portfolio": run_portfolio,
+    "batch": run_batch,
+}
 
 if __name__ == "__main__":
 
     try:
         approach = sys.argv[1]
         solver = sys.argv[2]
-        symbreak = sys.argv[3].lower() == "true"
+        # None stands for both values (batch only)
+        symbreak = None if sys.argv[3].lower() == "all" else sys.argv[3].lower() == "true"
         instance = sys.argv[4]      # integer os str, if str then 'all' is considered
 
-        if approach == "cp":
-            execute_cp(
-                instance_name=instance,
-                solver_name=solver,
-                symbreak=symbreak,
-            )
-            
-        if approach == "mip":
-            
-            
-            # EXAMPLE: python main.py mip gurobi False 1
-            # You can choose between gurobi and highs
-            execute_mip(
-                solver_name=solver, 
-                symbreak=symbreak, 
-                instance_name=instance
-                )
-            
-        if approach == "smt":
-            # EXAMPLE: python main.py smt z3 False 1
-            # The only solver supported is z3
-            execute_smt(
-                symbreak=symbreak,
-                instance_name=instance
-            )
+        if approach not in APPROACHES:
+            raise ValueError(f"unknown approach {approach}, choose from {', '.join(APPROACHES)}")
+        APPROACHES[approach](solver, symbreak, instance, *sys.argv[5:])
     except Exception as e:
         print("Wrong values, try again", e)
-